@@ -0,0 +1,283 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+# =============================================================================
+# BENCHMARK — latence des tableaux de bord Streamlit (sans navigateur)
+#
+# Chaque application est exécutée par l'AppTest de Streamlit sur un jeu de
+# test : les fichiers de données de l'étude, éventuellement répliqués
+# (--scale) avec des identifiants distincts, copiés dans un dossier
+# temporaire désigné à l'application par DATAVIZ_DATA_DIR.
+#
+# Pour chaque application, dans un processus neuf (imports et caches vides) :
+#   - démarrage à froid : premier rerun (chargement des données, index) ;
+#   - premier affichage : nouvelle session, caches du processus chauds ;
+#   - rerun après chaque interaction du scénario (période, pays, vue,
+#     page, filtres), rejoué --repeat fois dans des sessions neuves.
+#
+# Le rapport JSON (--report) se compare à un rapport précédent
+# (--baseline) : le script échoue si une médiane dépasse --tolerance fois
+# celle de référence (et d'au moins --min-delta ms), ou si une application
+# lève une exception.
+#
+#   python bench_apps.py --report avant.json
+#   python bench_apps.py --report apres.json --baseline avant.json
+#
+# Avec DATAVIZ_ENGINE=duckdb, les filtres passent par le moteur SQL
+# optionnel (studies/sql_engine.py) ; le rapport indique le moteur mesuré.
+#
+# Les widgets des fragments (onglet Publications de app_axes.py) relancent
+# tout le script sous AppTest : leur latence est un majorant.
+# =============================================================================
+
+ROOT = Path(__file__).resolve().parent
+
+# Scénarios : (nom, type de widget, début du libellé, valeur). Valeur entière
+# pour une liste déroulante = position de l'option ; fonction = calculée à
+# partir du widget affiché.
+APPS = {
+    'unresearchcollab': {
+        'script': ROOT / "studies/202603-unresearchcollab/app.py",
+        'files': {"cooperations_nantesu.parquet": ['doi', 'work_id']},
+        'scenario': [
+            ("Période", 'slider', "Sélectionner la plage d'années", (2022, 2024)),
+            ("Page 2 des institutions", 'number_input', "Page (sur", 2),
+            ("Pays partenaire", 'selectbox', "Choisir un pays partenaire", 1),
+            ("Vue Carte", 'radio', "Mode d'affichage", "Carte"),
+            ("Carte : institutions", 'radio', "Niveau de détail", "Institutions"),
+            ("Vue Dataviz", 'radio', "Mode d'affichage", "Dataviz"),
+            ("Domaine", 'selectbox', "Filtre par domaine", 1),
+            ("Nombre d'auteurs", 'selectbox', "Filtrer par nombre d'auteurs", 1),
+            ("Pôle", 'selectbox', "Filtrer par pôle", 1),
+            ("Vue Institutions", 'radio', "Mode d'affichage", "Institutions"),
+        ],
+    },
+    'triton': {
+        'script': ROOT / "studies/202603-triton/app.py",
+        'files': {"cooperations_ls2n.parquet": ['doi', 'work_id']},
+        'scenario': [
+            ("Période", 'slider', "Sélectionner la plage d'années", (2022, 2024)),
+            ("Page 2 des publications", 'number_input', "Page (sur", 2),
+            ("Pays partenaire", 'selectbox', "Choisir un pays partenaire", 1),
+            ("Vue Universités", 'radio', "Mode d'affichage", "Par Universités partenaires"),
+            ("Domaine", 'selectbox', "Choisir un domaine", 1),
+            ("Vue Publications", 'radio', "Mode d'affichage", "Par Publications"),
+            ("Tous les pays", 'selectbox', "Choisir un pays partenaire", 0),
+        ],
+    },
+    'centrale-axes': {
+        'script': ROOT / "studies/202604-centrale-axes/app_axes.py",
+        'files': {"centrale_axes_data.parquet": ['doi', 'work_id'],
+                  "centrale_axes_text.parquet": ['work_id']},
+        'scenario': [
+            ("Années", 'select_slider', "Années", lambda w: (max(w.value[0], w.value[1] - 2), w.value[1])),
+            ("Laboratoire", 'selectbox', "Laboratoire", 1),
+            ("Axe stratégique", 'selectbox', "Axe Stratégique", 1),
+            ("Tous les chercheurs", 'checkbox', "👩‍🔬 Chercheurs permanents", False),
+            ("Corrections seulement", 'checkbox', "👁️ Voir seulement les corrections", True),
+            ("Toutes les publications", 'checkbox', "👁️ Voir seulement les corrections", False),
+            ("Page 2", 'number_input', "Page:", 2),
+            ("Recherche", 'text_input', "🔍 Rechercher", "wind"),
+        ],
+    },
+}
+
+
+# =============================================================================
+# JEUX DE TEST
+# =============================================================================
+
+def build_fixture(app, data_dir, scale):
+    """Copie les fichiers de l'application dans data_dir, répliqués scale fois (identifiants suffixés)."""
+    source_dir = APPS[app]['script'].parent
+    for name, id_cols in APPS[app]['files'].items():
+        df = pd.read_parquet(source_dir / name)
+        copies = []
+        for k in range(scale):
+            copy = df.copy()
+            if k:
+                for col in id_cols:
+                    if col in copy.columns:
+                        copy[col] = copy[col].where(copy[col].isna(), copy[col].astype(str) + f"-{k}")
+            copies.append(copy)
+        pd.concat(copies, ignore_index=True).to_parquet(Path(data_dir) / name, index=False)
+
+
+def missing_files(app):
+    source_dir = APPS[app]['script'].parent
+    return [name for name in APPS[app]['files'] if not (source_dir / name).exists()]
+
+
+# =============================================================================
+# MESURES (processus fils, un par application)
+# =============================================================================
+
+def find_widget(at, kind, label):
+    return next((w for w in getattr(at, kind) if w.label.startswith(label)), None)
+
+
+def apply(at, kind, label, value):
+    """Applique une interaction ; False si le widget n'est pas affiché."""
+    widget = find_widget(at, kind, label)
+    if widget is None:
+        return False
+    if callable(value):
+        value = value(widget)
+    if kind == 'selectbox' and isinstance(value, int):
+        if value >= len(widget.options):
+            return False
+        widget.select_index(value)
+    elif kind == 'text_input':
+        widget.input(value)
+    else:
+        widget.set_value(value)
+    return True
+
+
+def timed_run(at):
+    t = time.perf_counter()
+    at.run()
+    return (time.perf_counter() - t) * 1000
+
+
+def errors(at):
+    return [e.message for e in at.exception]
+
+
+def measure(app, repeat, timeout):
+    from streamlit.testing.v1 import AppTest
+
+    script = str(APPS[app]['script'])
+    result = {'errors': []}
+
+    at = AppTest.from_file(script, default_timeout=timeout)
+    result['cold_start_ms'] = round(timed_run(at), 1)
+    result['errors'] += errors(at)
+
+    first, steps = [], {name: [] for name, *_ in APPS[app]['scenario']}
+    skipped = set()
+    for _ in range(repeat):
+        at = AppTest.from_file(script, default_timeout=timeout)
+        first.append(timed_run(at))
+        for name, kind, label, value in APPS[app]['scenario']:
+            if not apply(at, kind, label, value):
+                skipped.add(name)
+                continue
+            steps[name].append(timed_run(at))
+            result['errors'] += [f"{name} : {e}" for e in errors(at)]
+
+    result['first_render_ms'] = summarize(first)
+    result['reruns_ms'] = {name: summarize(times) for name, times in steps.items() if times}
+    result['skipped'] = sorted(skipped)
+    result['errors'] = list(dict.fromkeys(result['errors']))
+    return result
+
+
+def summarize(times):
+    return {'median': round(statistics.median(times), 1), 'min': round(min(times), 1),
+            'max': round(max(times), 1), 'runs': len(times)}
+
+
+def run_app(app, scale, repeat, timeout):
+    """Mesure une application dans un processus neuf, sur son jeu de test."""
+    with tempfile.TemporaryDirectory() as data_dir:
+        build_fixture(app, data_dir, scale)
+        env = dict(os.environ, DATAVIZ_DATA_DIR=data_dir)
+        env.pop("DATAVIZ_PERF", None)
+        proc = subprocess.run(
+            [sys.executable, __file__, "--worker", app, "--repeat", str(repeat), "--timeout", str(timeout)],
+            env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        return {'errors': [proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "échec du processus"]}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+# =============================================================================
+# COMPARAISON AVEC UN RAPPORT DE RÉFÉRENCE
+# =============================================================================
+
+def medians(result):
+    values = {'cold_start': result.get('cold_start_ms')}
+    if 'first_render_ms' in result:
+        values['first_render'] = result['first_render_ms']['median']
+    values.update({f"rerun : {k}": v['median'] for k, v in result.get('reruns_ms', {}).items()})
+    return {k: v for k, v in values.items() if v is not None}
+
+
+def regressions(report, baseline, tolerance, min_delta):
+    found = []
+    for app, result in report['apps'].items():
+        before = medians(baseline.get('apps', {}).get(app, {}))
+        for name, value in medians(result).items():
+            ref = before.get(name)
+            if ref is not None and value > tolerance * ref and value - ref >= min_delta:
+                found.append(f"{app} / {name} : {ref:.0f} ms → {value:.0f} ms")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latence des tableaux de bord Streamlit (AppTest, sans navigateur).")
+    parser.add_argument("--apps", nargs="+", choices=list(APPS), default=list(APPS))
+    parser.add_argument("--scale", type=int, default=1, help="Réplication des données du jeu de test")
+    parser.add_argument("--repeat", type=int, default=3, help="Sessions rejouant le scénario")
+    parser.add_argument("--timeout", type=float, default=300, help="Délai maximal d'un rerun (s)")
+    parser.add_argument("--report", default="bench_apps_report.json", help="Rapport JSON")
+    parser.add_argument("--baseline", help="Rapport de référence à comparer")
+    parser.add_argument("--tolerance", type=float, default=1.5, help="Ralentissement toléré (facteur)")
+    parser.add_argument("--min-delta", type=float, default=50, help="Écart minimal signalé (ms)")
+    parser.add_argument("--worker", choices=list(APPS), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(measure(args.worker, args.repeat, args.timeout), ensure_ascii=False))
+        return
+
+    report = {
+        'time': datetime.now().isoformat(timespec='seconds'),
+        'scale': args.scale, 'repeat': args.repeat,
+        'engine': os.environ.get("DATAVIZ_ENGINE", "pandas"),
+        'apps': {},
+    }
+    for app in args.apps:
+        missing = missing_files(app)
+        if missing:
+            print(f"{app} : ignorée, fichier(s) absent(s) : {', '.join(missing)}")
+            continue
+        print(f"{app} (x{args.scale}) ...", flush=True)
+        result = report['apps'][app] = run_app(app, args.scale, args.repeat, args.timeout)
+        for name, value in medians(result).items():
+            print(f"  {name:<40} {value:>10.1f} ms")
+        for name in result.get('skipped', []):
+            print(f"  {name:<40} {'non affiché':>13}")
+        for error in result['errors']:
+            print(f"  ⚠️ {error}")
+
+    with open(args.report, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Rapport : {args.report}")
+
+    failed = any(result['errors'] for result in report['apps'].values())
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get('scale') != args.scale:
+            print(f"⚠️ Référence mesurée à l'échelle x{baseline.get('scale')}, comparaison peu significative")
+        slower = regressions(report, baseline, args.tolerance, args.min_delta)
+        for line in slower:
+            print(f"RÉGRESSION {line}")
+        failed = failed or bool(slower)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,12 +3,23 @@ import pandas as pd
 import altair as alt
 import io
 import re
+import sys
+from pathlib import Path
+
+# Instrumentation des reruns, partagée par les études (studies/perf.py)
+STUDIES_DIR = str(Path(__file__).resolve().parents[2])
+if STUDIES_DIR not in sys.path:
+    sys.path.insert(0, STUDIES_DIR)
+import perf
 
 # ==============================================================================
 # 0. CONFIGURATION DE LA PAGE (DOIT ÊTRE LE PREMIER APPEL STREAMLIT !)
 # ==============================================================================
 
 
+# Instrumentation des reruns (DATAVIZ_PERF=1 ou ?perf=1), voir perf.py
+perf.start(__file__)
+
 # Nom du fichier à lire
 FILE_NAME = "studies/202511-PoleST/data/scopus-subjectareas.csv"
 
@@ -16,7 +27,7 @@ FILE_NAME = "studies/202511-PoleST/data/scopus-subjectareas.csv"
 # 1. FONCTION DE PRÉPARATION DES DONNÉES (Adaptée pour le nouveau CSV)
 # ==============================================================================
 
-@st.cache_data
+@perf.cache_data
 def load_and_transform_data(file_name):
     """
     Charge le CSV pivoté (avec ';' et ',' décimal) et le transforme au format long.
@@ -60,6 +71,7 @@ def load_and_transform_data(file_name):
     return df_long, df_pivot
 
 # Charger les données depuis le fichier
+perf.mark("Chargement")
 df_long, df_pivot = load_and_transform_data(FILE_NAME)
 
 # Vérification simple pour s'assurer que les données ont été chargées
@@ -70,6 +82,7 @@ if df_long.empty:
 # 2. STRUCTURE DE L'APPLICATION STREAMLIT
 # ==============================================================================
 
+perf.mark("Filtres")
 st.title("📊 Visualisation des disciplines Scopus (research areas) du Pôle S&T")
 st.markdown("Utilisez la barre latérale pour filtrer et comparer les métriques des différents périmètres (A, B, C).")
 
@@ -138,6 +151,7 @@ if df_viz.empty:
     st.warning(f"Aucune donnée '{selected_metric.strip()}' trouvée pour cette combinaison Subject Area/Subcategory dans les périmètres A, B ou C.")
 else:
     # --- VISUALISATION ALTAIR ---
+    perf.mark("Graphique")
     
     metric_name = selected_metric.strip()
     # Déterminer si la métrique est un indicateur de ratio pour une échelle appropriée
@@ -155,6 +169,7 @@ else:
     st.altair_chart(chart, use_container_width=True)
 
 # --- AFFICHAGE DES DONNÉES BRUTES FILTRÉES ---
+perf.mark("Données brutes")
 
 st.markdown("---")
 st.header(f"🔍 Données Brutes pour la métrique : **{selected_metric.strip()}**")
@@ -194,4 +209,6 @@ if not df_raw.empty:
     
     st.dataframe(df_temp, use_container_width=True)
 else:
-    st.info("Aucune donnée complète trouvée pour cette combinaison Subject Area/Subcategory.")
\ No newline at end of file
+    st.info("Aucune donnée complète trouvée pour cette combinaison Subject Area/Subcategory.")
+
+perf.panel()
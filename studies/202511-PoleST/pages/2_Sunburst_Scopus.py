@@ -10,12 +10,23 @@ import pandas as pd
 import plotly.express as px
 import io
 import re
+import sys
+from pathlib import Path
+
+# Instrumentation des reruns, partagée par les études (studies/perf.py)
+STUDIES_DIR = str(Path(__file__).resolve().parents[2])
+if STUDIES_DIR not in sys.path:
+    sys.path.insert(0, STUDIES_DIR)
+import perf
 
 # ==============================================================================
 # 0. CONFIGURATION DE LA PAGE
 # ==============================================================================
 
 
+# Instrumentation des reruns (DATAVIZ_PERF=1 ou ?perf=1), voir perf.py
+perf.start(__file__)
+
 # Nom du fichier à lire
 FILE_NAME = "studies/202511-PoleST/data/scopus-subjectareas.csv"
 
@@ -27,7 +38,7 @@ ALLOWED_METRICS = ['Scholarly Output', 'Citations']
 # 1. FONCTION DE PRÉPARATION DES DONNÉES
 # ==============================================================================
 
-@st.cache_data
+@perf.cache_data
 def load_and_transform_data(file_name):
     """
     Charge le CSV, le transforme au format long, et extrait les métriques/périmètres.
@@ -73,6 +84,7 @@ def load_and_transform_data(file_name):
     return df_long
 
 # Charger les données depuis le fichier
+perf.mark("Chargement")
 df_long = load_and_transform_data(FILE_NAME)
 
 if df_long.empty:
@@ -82,7 +94,7 @@ if df_long.empty:
 # 2. DICTIONNAIRE DE COULEURS FIXE
 # ==============================================================================
 
-@st.cache_data
+@perf.cache_data
 def generate_color_map(df):
     """Crée et retourne un dictionnaire de couleurs pour toutes les Subject Area."""
     unique_areas = df['Subject Area'].unique()
@@ -126,6 +138,7 @@ def create_sunburst(df, perimeter_name, metric, color_map):
 # 4. STRUCTURE DE L'APPLICATION STREAMLIT
 # ==============================================================================
 
+perf.mark("Filtres")
 st.title("☀️ Visualisation des disciplines Scopus (research areas) du Pôle S&T")
 
 # ----------------- BARRE LATÉRALE (Filtres et Légende) -----------------
@@ -164,6 +177,7 @@ st.markdown(f"**Périmètre sélectionné :** **{selected_perimeter}**")
 st.markdown(f"**Métrique sélectionnée :** **{selected_metric}**")
 
 # Création et affichage du Sunburst Chart unique
+perf.mark("Sunburst")
 fig = create_sunburst(df_long, selected_perimeter, selected_metric, SUBJECT_AREA_COLOR_MAP)
 
 if fig is not None:
@@ -174,4 +188,6 @@ else:
 # ----------------- CONCLUSION -----------------
 
 st.markdown("---")
-st.markdown(f"Ce graphique Sunburst montre la répartition de la métrique **{selected_metric}** par discipline pour le **{selected_perimeter}**. L'anneau central correspond à la **Subject Area**, et l'anneau externe aux **Subcategory**.")
\ No newline at end of file
+st.markdown(f"Ce graphique Sunburst montre la répartition de la métrique **{selected_metric}** par discipline pour le **{selected_perimeter}**. L'anneau central correspond à la **Subject Area**, et l'anneau externe aux **Subcategory**.")
+
+perf.panel()
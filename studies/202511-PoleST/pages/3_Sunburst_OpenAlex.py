@@ -13,10 +13,21 @@ from concurrent.futures import ThreadPoolExecutor
 from matplotlib.colors import to_rgb, to_hex
 import numpy as np
 import warnings
+import sys
+from pathlib import Path
+
+# Instrumentation des reruns, partagée par les études (studies/perf.py)
+STUDIES_DIR = str(Path(__file__).resolve().parents[2])
+if STUDIES_DIR not in sys.path:
+    sys.path.insert(0, STUDIES_DIR)
+import perf
 
 # Supprimer le warning concernant l'utilisation future de to_rgb/to_hex
 warnings.filterwarnings("ignore", category=FutureWarning)
 
+# Instrumentation des reruns (DATAVIZ_PERF=1 ou ?perf=1), voir perf.py
+perf.start(__file__)
+
 
 # --------------------------------------------------------
 # CONFIGURATION : LISTE DES INSTITUTIONS AUTORISÉES
@@ -77,7 +88,7 @@ def color_scale(domain):
 # --------------------------------------------------------
 # API
 # --------------------------------------------------------
-@st.cache_data(show_spinner=False)
+@perf.cache_data(show_spinner=False)
 def fetch_subfield_counts(inst, period):
     """Récupère les comptes de publication groupés par subfield."""
     url = f"{BASE_WORKS_API}?group_by=primary_topic.subfield.id&per_page=200&filter=authorships.institutions.lineage:{inst},publication_year:{period}"
@@ -97,7 +108,7 @@ def fetch_subfield_counts(inst, period):
     return pd.DataFrame([{ "subfield_id": x["key"], "count": x["count"] } for x in data])
 
 
-@st.cache_data(show_spinner=False)
+@perf.cache_data(show_spinner=False)
 def fetch_subfield_details(subfield_id):
     """Récupère la hiérarchie complète ET les IDs pour la construction des liens."""
     sid = subfield_id.split("/")[-1]
@@ -140,6 +151,7 @@ def fetch_subfield_details(subfield_id):
 # --------------------------------------------------------
 def build_chart(institution, period, max_subfields):
 
+    perf.mark("Requêtes OpenAlex")
     df = fetch_subfield_counts(institution, period)
     if df is None or df.empty:
         st.error("Aucun résultat trouvé pour cette institution.")
@@ -164,6 +176,7 @@ def build_chart(institution, period, max_subfields):
 
     # --- Préparation des couleurs et des IDs ---
    # --- Préparation des couleurs et des IDs ---
+    perf.mark("Sunburst")
     cmap = {}
     node_info = {} 
 
@@ -266,6 +279,7 @@ def build_chart(institution, period, max_subfields):
         'Subfield_Name': 'Sous-champ'
     })
 
+    perf.mark("Tableau")
     st.subheader(f"Données agrégées (Top {len(df_chart)})")
     
     # Utilisation de st.data_editor avec LinkColumn pour un lien cliquable natif
@@ -285,6 +299,7 @@ def build_chart(institution, period, max_subfields):
 # INTERFACE STREAMLIT
 # --------------------------------------------------------
 
+perf.mark("Interface")
 st.title("☀️ Visualisation des Domaines OpenAlex (domains/fields/subfields) du Pôle S&T")
 
 # Sélecteur institution
@@ -301,4 +316,6 @@ if st.button("Générer le graphique"):
         st.error("L'identifiant OpenAlex d'une institution doit commencer par 'i'.")
     else:
         with st.spinner(f'Chargement des données OpenAlex et construction du graphique pour les {max_sf} principaux subfields...'):
-            build_chart(inst_id, period.strip(), max_sf)
\ No newline at end of file
+            build_chart(inst_id, period.strip(), max_sf)
+
+perf.panel()
@@ -7,6 +7,14 @@ import plotly.graph_objects as go
 from concurrent.futures import ThreadPoolExecutor
 from matplotlib.colors import to_rgb, to_hex
 import numpy as np
+import sys
+from pathlib import Path
+
+# Instrumentation des reruns, partagée par les études (studies/perf.py)
+STUDIES_DIR = str(Path(__file__).resolve().parents[2])
+if STUDIES_DIR not in sys.path:
+    sys.path.insert(0, STUDIES_DIR)
+import perf
 
 # --------------------------------------------------------
 # CONFIGURATION
@@ -58,7 +66,7 @@ def color_scale(domain):
 # --------------------------------------------------------
 # APPELS API
 # --------------------------------------------------------
-@st.cache_data(show_spinner=False)
+@perf.cache_data(show_spinner=False)
 def fetch_subfield_counts(inst_ids, period):
     # inst_ids est la chaîne d'identifiants (ex: "i1|i2|i3")
     url = (
@@ -73,7 +81,7 @@ def fetch_subfield_counts(inst_ids, period):
     ])
 
 
-@st.cache_data(show_spinner=False)
+@perf.cache_data(show_spinner=False)
 def fetch_subfield_details(subfield_id):
     sid = subfield_id.split("/")[-1]
     try:
@@ -108,6 +116,7 @@ def create_openalex_url(row, inst_ids, period):
 def build_chart(institution_name, inst_ids, period, max_subfields):
 
     # ---- 1) RÉCUPÉRATION SUBFIELDS ----
+    perf.mark("Requêtes OpenAlex")
     df = fetch_subfield_counts(inst_ids, period) # Utilise la chaîne d'IDs
     if df is None or df.empty:
         st.error(f"Aucun résultat trouvé pour '{institution_name}' sur la période {period}.")
@@ -123,6 +132,7 @@ def build_chart(institution_name, inst_ids, period, max_subfields):
     df_final = df_final[df_final.Domain_Name != "N/A"].sort_values("count", ascending=False)
 
     df_chart = df_final.head(max_subfields).copy()
+    perf.mark("Sunburst")
     
     # AJOUT : Création de la colonne de lien OpenAlex
     df_chart['URL_OpenAlex'] = df_chart.apply(
@@ -234,6 +244,9 @@ def build_chart(institution_name, inst_ids, period, max_subfields):
 # INTERFACE STREAMLIT
 # --------------------------------------------------------
 st.set_page_config(page_title="OpenAlex Sunburst", layout="wide")
+# Instrumentation des reruns (DATAVIZ_PERF=1 ou ?perf=1), voir perf.py
+perf.start(__file__)
+perf.mark("Interface")
 st.title("Sunburst chart sur les domaines OpenAlex – Domains / Fields / Subfields")
 
 # Récupérer les noms des institutions pour la liste déroulante
@@ -255,4 +268,6 @@ max_sf = st.slider("Nombre max de Subfields", 10, 200, 50, 10)
 
 if st.button("Générer la Cartographie"):
     # Appel de la fonction avec le nom et l'ID/les IDs correspondants
-    build_chart(selected_name, selected_id, period.strip(), max_sf)
\ No newline at end of file
+    build_chart(selected_name, selected_id, period.strip(), max_sf)
+
+perf.panel()
@@ -1,24 +1,37 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-import pycountry
+import json
 import os
+import sys
+from pathlib import Path
+
+# Moteur SQL optionnel des filtres (DATAVIZ_ENGINE=duckdb), partagé par les études (studies/sql_engine.py)
+STUDIES_DIR = str(Path(__file__).resolve().parents[1])
+if STUDIES_DIR not in sys.path:
+    sys.path.insert(0, STUDIES_DIR)
+import sql_engine
 
 st.set_page_config(page_title="Dashboard Coopération Nantes", layout="wide")
 
+# Noms français des pays (table générée par ../202603-unresearchcollab/country_names.py)
+with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "country_names_fr.json"), encoding="utf-8") as f:
+    COUNTRY_NAMES = json.load(f)
+
 def get_country_name(code):
-    try:
-        if code == 'UK':
-            return 'United Kingdom'
-        c = pycountry.countries.get(alpha_2=code)
-        return c.name if c else code
-    except:
-        return code
-
-@st.cache_data
+    return COUNTRY_NAMES.get(str(code).upper(), code)
+
+# Copy-on-Write (par défaut à partir de pandas 3) : les sélections du jeu de
+# données partagé ne le copient pas et ne peuvent pas le modifier
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+
+@st.cache_resource
 def load_data():
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    file_path = os.path.join(current_dir, "cooperations_ls2n.parquet")
+    """Jeu de données chargé une fois par processus et partagé en lecture seule entre les sessions."""
+    # Dossier des données : celui du script, sauf DATAVIZ_DATA_DIR (jeux de test de bench_apps.py)
+    data_dir = os.environ.get("DATAVIZ_DATA_DIR", os.path.dirname(os.path.abspath(__file__)))
+    file_path = os.path.join(data_dir, "cooperations_ls2n.parquet")
     df = pd.read_parquet(file_path)
     # On s'assure que les noms sont bien formatés pour la recherche
     df['author'] = df['author'].fillna("Inconnu")
@@ -32,6 +45,35 @@ def load_data():
     return df
 
 df = load_data()
+engine = sql_engine.get()
+
+# Requêtes des filtres sur la vue 'ls2n' (cooperations_ls2n.parquet), mêmes
+# règles que les filtres pandas : une publication (doi, les publications sans
+# DOI formant un seul groupe comme avec isin) est retenue si l'une de ses
+# lignes contient la valeur.
+def sql_rows(author):
+    """Lignes des publications de l'auteur choisi (toutes si aucun) et paramètres."""
+    if author == "Tous les auteurs":
+        return "ls2n", ()
+    by_author = "bool_or(coalesce(author, 'Inconnu') = ?) OVER (PARTITION BY doi)"
+    return f"(SELECT * FROM ls2n QUALIFY {by_author})", (author,)
+
+def sql_options(column, author, parent=None, value=None):
+    """Valeurs de la colonne (liste séparée par '|') des lignes retenues, triées."""
+    rows, params = sql_rows(author)
+    where = ""
+    if parent is not None:
+        where = f"WHERE contains({parent}, ?)"
+        params += (value,)
+    return engine.values(f"SELECT DISTINCT trim(unnest(string_split({column}, '|'))) FROM {rows} {where}", params)
+
+def sql_dois(author, years, filters):
+    """doi des publications de la période qui passent les filtres ((colonne, valeur), ...)."""
+    rows, params = sql_rows(author)
+    having = " AND ".join(["TRUE"] + [f"bool_or(contains({column}, ?))" for column, _ in filters])
+    params += (int(years[0]), int(years[1])) + tuple(value for _, value in filters)
+    sql = f"SELECT doi FROM {rows} WHERE year BETWEEN ? AND ? GROUP BY doi HAVING {having}"
+    return engine.query(sql, params)['doi'].to_numpy()
 
 # --- SIDEBAR : FILTRES ---
 st.sidebar.header("📅 Période")
@@ -46,7 +88,8 @@ year_range = st.sidebar.slider(
 if 'selected_author' not in st.session_state:
     st.session_state.selected_author = "Tous les auteurs"
 
-if st.session_state.selected_author != "Tous les auteurs":
+# (avec le moteur SQL, les options et le filtrage sont des requêtes : pas de sous-table)
+if engine is None and st.session_state.selected_author != "Tous les auteurs":
     author_dois = df[df['author'] == st.session_state.selected_author]['doi'].unique()
     working_df = df[df['doi'].isin(author_dois)]
 else:
@@ -55,8 +98,11 @@ else:
 # --- FILTRE PAYS (Dynamique selon l'auteur choisi) ---
 st.sidebar.header("🌍 Filtre Géographique")
 # On "explose" les pays pour avoir une liste propre d'individus
-all_countries_series = working_df['country'].str.split('|').explode().str.strip()
-available_countries = sorted(all_countries_series[all_countries_series != 'FR'].dropna().unique())
+if engine is not None:
+    available_countries = [c for c in sql_options('country', st.session_state.selected_author) if c != 'FR']
+else:
+    all_countries_series = working_df['country'].str.split('|').explode().str.strip()
+    available_countries = sorted(all_countries_series[all_countries_series != 'FR'].dropna().unique())
 
 selected_country = st.sidebar.selectbox(
     "Choisir un pays partenaire :", 
@@ -67,31 +113,46 @@ selected_country = st.sidebar.selectbox(
 # Sous-filtre établissement (uniquement si pays choisi)
 selected_inst = "Tous les établissements"
 if selected_country != "Tous les pays":
-    country_mask = working_df['country'].str.contains(selected_country, na=False)
-    all_insts = working_df[country_mask]['institution'].str.split('|').explode().str.strip()
-    available_insts = sorted(all_insts.dropna().unique())
+    if engine is not None:
+        available_insts = sql_options('institution', st.session_state.selected_author, 'country', selected_country)
+    else:
+        country_mask = working_df['country'].str.contains(selected_country, na=False)
+        all_insts = working_df[country_mask]['institution'].str.split('|').explode().str.strip()
+        available_insts = sorted(all_insts.dropna().unique())
     selected_inst = st.sidebar.selectbox("Choisir un établissement :", ["Tous les établissements"] + available_insts)
 
 # --- FILTRE DOMAINE (Subfields) ---
 st.sidebar.header("🎓 Domaine de recherche")
-all_subfields_series = working_df['subfields'].str.split('|').explode().str.strip()
-available_subfields = sorted(all_subfields_series.dropna().unique())
+if engine is not None:
+    available_subfields = sql_options('subfields', st.session_state.selected_author)
+else:
+    all_subfields_series = working_df['subfields'].str.split('|').explode().str.strip()
+    available_subfields = sorted(all_subfields_series.dropna().unique())
 selected_subfield = st.sidebar.selectbox("Choisir un domaine :", ["Tous les domaines"] + available_subfields)
 
 # --- FILTRE SUJET (Topics) ---
 st.sidebar.header("🔬 Sujet de recherche")
 # Filtrer les thèmes disponibles selon le domaine choisi pour plus de pertinence
-temp_df = working_df
-if selected_subfield != "Tous les domaines":
-    temp_df = working_df[working_df['subfields'].str.contains(selected_subfield, na=False, regex=False)]
+if engine is not None:
+    if selected_subfield != "Tous les domaines":
+        available_topics = sql_options('topics', st.session_state.selected_author, 'subfields', selected_subfield)
+    else:
+        available_topics = sql_options('topics', st.session_state.selected_author)
+else:
+    temp_df = working_df
+    if selected_subfield != "Tous les domaines":
+        temp_df = working_df[working_df['subfields'].str.contains(selected_subfield, na=False, regex=False)]
 
-all_topics_series = temp_df['topics'].str.split('|').explode().str.strip()
-available_topics = sorted(all_topics_series.dropna().unique())
+    all_topics_series = temp_df['topics'].str.split('|').explode().str.strip()
+    available_topics = sorted(all_topics_series.dropna().unique())
 selected_topic = st.sidebar.selectbox("Choisir un sujet :", ["Tous les sujets"] + available_topics)
 
 # --- RECHERCHE PAR CHERCHEUR (Déplacé en bas) ---
 st.sidebar.header("👤 Chercheur Nantais")
-nantes_authors_list = sorted(df[df['is_nantes'] == True]['author'].unique())
+if engine is not None:
+    nantes_authors_list = engine.values("SELECT DISTINCT coalesce(author, 'Inconnu') FROM ls2n WHERE is_nantes")
+else:
+    nantes_authors_list = sorted(df[df['is_nantes'] == True]['author'].unique())
 selected_author = st.sidebar.selectbox(
     "Filtrer par auteur nantais :",
     ["Tous les auteurs"] + nantes_authors_list,
@@ -99,26 +160,39 @@ selected_author = st.sidebar.selectbox(
 )
 
 # --- LOGIQUE DE FILTRAGE FINAL ---
-filtered_df = working_df.copy()
+if engine is not None:
+    sql_filters = []  # (colonne, valeur)
+    if selected_country != "Tous les pays":
+        sql_filters.append(('country', selected_country))
+    if selected_inst != "Tous les établissements":
+        sql_filters.append(('institution', selected_inst))
+    if selected_subfield != "Tous les domaines":
+        sql_filters.append(('subfields', selected_subfield))
+    if selected_topic != "Tous les sujets":
+        sql_filters.append(('topics', selected_topic))
+    dois = sql_dois(st.session_state.selected_author, year_range, tuple(sql_filters))
+    filtered_df = df[df['doi'].isin(dois) & (df['year'] >= year_range[0]) & (df['year'] <= year_range[1])]
+else:
+    filtered_df = working_df
 
-# Filtre par année
-filtered_df = filtered_df[(filtered_df['year'] >= year_range[0]) & (filtered_df['year'] <= year_range[1])]
+    # Filtre par année
+    filtered_df = filtered_df[(filtered_df['year'] >= year_range[0]) & (filtered_df['year'] <= year_range[1])]
 
-if selected_country != "Tous les pays":
-    c_dois = filtered_df[filtered_df['country'].str.contains(selected_country, na=False)]['doi'].unique()
-    filtered_df = filtered_df[filtered_df['doi'].isin(c_dois)]
-    
-if selected_inst != "Tous les établissements":
-    i_dois = filtered_df[filtered_df['institution'].str.contains(selected_inst, na=False, regex=False)]['doi'].unique()
-    filtered_df = filtered_df[filtered_df['doi'].isin(i_dois)]
+    if selected_country != "Tous les pays":
+        c_dois = filtered_df[filtered_df['country'].str.contains(selected_country, na=False)]['doi'].unique()
+        filtered_df = filtered_df[filtered_df['doi'].isin(c_dois)]
+
+    if selected_inst != "Tous les établissements":
+        i_dois = filtered_df[filtered_df['institution'].str.contains(selected_inst, na=False, regex=False)]['doi'].unique()
+        filtered_df = filtered_df[filtered_df['doi'].isin(i_dois)]
 
-if selected_subfield != "Tous les domaines":
-    s_dois = filtered_df[filtered_df['subfields'].str.contains(selected_subfield, na=False, regex=False)]['doi'].unique()
-    filtered_df = filtered_df[filtered_df['doi'].isin(s_dois)]
+    if selected_subfield != "Tous les domaines":
+        s_dois = filtered_df[filtered_df['subfields'].str.contains(selected_subfield, na=False, regex=False)]['doi'].unique()
+        filtered_df = filtered_df[filtered_df['doi'].isin(s_dois)]
 
-if selected_topic != "Tous les sujets":
-    t_dois = filtered_df[filtered_df['topics'].str.contains(selected_topic, na=False, regex=False)]['doi'].unique()
-    filtered_df = filtered_df[filtered_df['doi'].isin(t_dois)]
+    if selected_topic != "Tous les sujets":
+        t_dois = filtered_df[filtered_df['topics'].str.contains(selected_topic, na=False, regex=False)]['doi'].unique()
+        filtered_df = filtered_df[filtered_df['doi'].isin(t_dois)]
 
 display_df = filtered_df
 
@@ -1,12 +1,31 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
 import plotly.express as px
-import pycountry
-from babel import Locale
+import json
 import os
+import sys
+from pathlib import Path
+
+# Instrumentation des reruns, partagée par les études (studies/perf.py)
+STUDIES_DIR = str(Path(__file__).resolve().parents[1])
+if STUDIES_DIR not in sys.path:
+    sys.path.insert(0, STUDIES_DIR)
+import perf
+import sql_engine
+import collab_sql
+from collab_data import AuthorIndex, PartnerTable, build_facet_index, read_dataset, structure_bits
 
 st.set_page_config(page_title="Dashboard Coopération Nantes Université", layout="wide")
 
+# Copy-on-Write (par défaut à partir de pandas 3) : les sélections du jeu de
+# données partagé ne le copient pas et ne peuvent pas le modifier
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+
+# Instrumentation des reruns (DATAVIZ_PERF=1 ou ?perf=1), voir perf.py
+perf.start(__file__)
+
 # Dictionnaire des unités de recherche nantaises (ID OpenAlex -> libellé)
 NANTES_MAP = {
     "I4387152714": "CAPHI",
@@ -69,43 +88,26 @@ POLES_MAP = {
     "Pôle Sociétés": ["CDMO", "CENS", "DCS", "IRDP", "LEMNA"]
 }
 
+# Structures nantaises (établissements, pôles, unités) → identifiants OpenAlex ; un bit par structure
+STRUCTURES = {
+    **{name: [cid] for name, cid in COMPONENTS_MAP.items()},
+    **{pole: [NANTES_LABEL_TO_ID[u] for u in units if u in NANTES_LABEL_TO_ID] for pole, units in POLES_MAP.items()},
+    **{label: [uid] for uid, label in NANTES_MAP.items()},
+}
+STRUCTURE_BIT = {name: np.uint64(1 << i) for i, name in enumerate(STRUCTURES)}
+
+# Dossier des données : celui du script, sauf DATAVIZ_DATA_DIR (jeux de test de bench_apps.py)
+DATA_DIR = os.environ.get("DATAVIZ_DATA_DIR", os.path.dirname(os.path.abspath(__file__)))
+DATA_FILE = os.path.join(DATA_DIR, "cooperations_nantesu.parquet")
+
+# Noms français des pays (table générée par country_names.py)
+with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "country_names_fr.json"), encoding="utf-8") as f:
+    COUNTRY_NAMES = json.load(f)
+
 def get_country_name(code):
-    try:
-        # Cas particuliers
-        if code == 'UK': code = 'GB'
-        
-        # Tentative de traduction via Babel (standard français)
-        locale = Locale('fr')
-        name = locale.territories.get(code.upper())
-        if name:
-            return name
-            
-        # Fallback sur pycountry si non trouvé par Babel
-        c = pycountry.countries.get(alpha_2=code.upper())
-        return c.name if c else code
-    except:
-        return code
-
-def explode_parallel_cols(df, cols, id_col='doi'):
-    """Explose des colonnes séparées par '|' en s'assurant qu'elles restent alignées."""
-    if df.empty:
-        return pd.DataFrame(columns=[id_col] + cols)
-    split = {c: df[c].fillna('').astype(str).str.split('|') for c in cols}
-    # Calculer le nombre d'éléments pour chaque ligne (doit être identique pour toutes les colonnes de la ligne)
-    max_len = pd.concat([s.apply(len) for s in split.values()], axis=1).max(axis=1)
-    
-    rows = []
-    for idx in df.index:
-        n = max_len[idx]
-        parts = {c: (split[c][idx] + [''] * n)[:n] for c in cols}
-        for i in range(n):
-            row_data = {id_col: df.at[idx, id_col]}
-            for c in cols:
-                row_data[c] = parts[c][i].strip()
-            rows.append(row_data)
-    return pd.DataFrame(rows)
-
-def render_publication(doi, work_data, selected_author="", selected_country="Tous les pays"):
+    return COUNTRY_NAMES.get(str(code).upper(), code)
+
+def render_publication(doi, work_data, selected_author_id="", selected_country="Tous les pays"):
     """Affiche une publication sous forme d'expander avec équipe Nantes, partenaires et métadonnées."""
     title = work_data['title'].iloc[0] if not pd.isna(work_data['title'].iloc[0]) else "Sans titre"
     year = work_data['year'].iloc[0]
@@ -115,9 +117,9 @@ def render_publication(doi, work_data, selected_author="", selected_country="Tou
         with c1:
             st.write("**Équipe Nantes :**")
             n_auths = work_data[work_data['is_nantes'] == True]
-            for _, r in n_auths.iterrows():
-                style = f"**{r['author']}**" if r['author'] == selected_author else r['author']
-                inst_label = r['institution'].replace('|', ' / ')
+            for author, author_id, institution in zip(n_auths['author'], n_auths['author_id'], n_auths['institution']):
+                style = f"**{author}**" if author_id == selected_author_id else author
+                inst_label = institution.replace('|', ' / ')
                 st.write(f"👤 {style}  \n*{inst_label}*")
         with c2:
             st.write("**Partenaires Internationaux :**")
@@ -125,9 +127,9 @@ def render_publication(doi, work_data, selected_author="", selected_country="Tou
             f_auths = work_data[work_data['is_nantes'] == False]
             
             partners_to_show = []
-            for _, r in f_auths.iterrows():
-                insts = str(r['institution']).split('|')
-                cntrs = str(r['country']).split('|')
+            for author, institution, country in zip(f_auths['author'], f_auths['institution'], f_auths['country']):
+                insts = str(institution).split('|')
+                cntrs = str(country).split('|')
                 
                 for i, c in zip(insts, cntrs):
                     c_clean = c.strip()
@@ -136,7 +138,7 @@ def render_publication(doi, work_data, selected_author="", selected_country="Tou
                     if selected_country != "Tous les pays" and c_clean != selected_country:
                         continue
                     partners_to_show.append({
-                        'author': r['author'],
+                        'author': author,
                         'institution': i.strip(),
                         'country': c_clean
                     })
@@ -165,10 +167,20 @@ def render_publication(doi, work_data, selected_author="", selected_country="Tou
 
         openalex_id = work_data['work_id'].iloc[0]
         authors_count = work_data['authors_count'].iloc[0] if 'authors_count' in work_data.columns else "N/A"
+        doi = doi if isinstance(doi, str) else ""
         doi_display = doi if doi else "N/A"
         doi_link = f"[{doi_display}]({doi_display})" if doi else "N/A"
         st.caption(f"**DOI:** {doi_link} | **OpenAlex:** [{openalex_id}](https://openalex.org/works/{openalex_id}) | **👥 Auteurs:** {authors_count}")
 
+def group_rows(frame, key='doi'):
+    """Positions des lignes de chaque publication de frame, calculées en une passe (sans DOI : ignorées)."""
+    return frame.groupby(key, sort=False).indices
+
+def rows_for(frame, groups, keys):
+    """Lignes de frame des publications keys, dans l'ordre de frame (équivalent de frame[frame['doi'].isin(keys)])."""
+    positions = [groups[k] for k in keys if k in groups]
+    return frame.iloc[np.sort(np.concatenate(positions))] if positions else frame.iloc[:0]
+
 def render_domains_topics(relevant_df, max_items=10):
     """Affiche les 4 niveaux OpenAlex triés par fréquence."""
     levels = [
@@ -179,12 +191,12 @@ def render_domains_topics(relevant_df, max_items=10):
     ]
     
     for col, label in levels:
-        paper_data = relevant_df[['doi', col]].drop_duplicates()
+        paper_data = relevant_df[['work_id', col]].drop_duplicates()
         exploded = paper_data.assign(
             val=paper_data[col].str.split('|')
         ).explode('val')
         exploded['val'] = exploded['val'].str.strip()
-        counts = exploded[exploded['val'] != ""].groupby('val')['doi'].nunique().sort_values(ascending=False)
+        counts = exploded[exploded['val'] != ""].groupby('val')['work_id'].nunique().sort_values(ascending=False)
         
         st.write(f"**{label} :**")
         if counts.empty:
@@ -195,11 +207,14 @@ def render_domains_topics(relevant_df, max_items=10):
             st.write(", ".join(items) + more)
 
 
-@st.cache_data
+@st.cache_resource
 def load_data():
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    file_path = os.path.join(current_dir, "cooperations_nantesu.parquet")
-    df = pd.read_parquet(file_path)
+    """
+    Jeu de données chargé une fois par processus et partagé entre toutes les
+    sessions (sans copie par session). Il ne doit jamais être modifié : les
+    filtres en extraient des sous-tables.
+    """
+    df = read_dataset(DATA_FILE)
     
     # Conversion forcée des colonnes catégorielles en chaînes pour éviter les 0 fantômes dans les filtres/groupbys
     for col in df.select_dtypes(include=['category']).columns:
@@ -207,6 +222,10 @@ def load_data():
         
     # On s'assure que les noms sont bien formatés pour la recherche
     df['author'] = df['author'].fillna("Inconnu")
+    # Identifiant OpenAlex de l'auteur (extractions antérieures sans author_id : le nom en tient lieu)
+    if 'author_id' not in df.columns:
+        df['author_id'] = df['author']
+    df['author_id'] = df['author_id'].where(df['author_id'].notna() & (df['author_id'] != ""), df['author'])
     
     # Sécurité : si le cache Streamlit est ancien et n'a pas les nouvelles colonnes
     for col in ['topics', 'subfields', 'fields', 'domains', 'city', 'authors_count']:
@@ -215,9 +234,71 @@ def load_data():
         
     return df
 
+@st.cache_resource
+def load_facets():
+    """Index des filtres (pays, institutions, thématiques, auteurs, structures), construit une seule fois."""
+    return build_facet_index(load_data())
+
+# Niveaux de détail de la carte : taille des cellules de regroupement (degrés), None = institutions
+MAP_LEVELS = {"Monde": 10.0, "Région": 2.0, "Institutions": None}
+
+@st.cache_resource
+def load_partners():
+    """Table des institutions partenaires × publications (et grilles de la carte), construite une seule fois."""
+    return PartnerTable(load_data(), load_facets(), grid_sizes=[size for size in MAP_LEVELS.values() if size])
+
+def map_view(lats, lons):
+    """Centre et zoom de la carte englobant les points."""
+    max_range = max(lats.max() - lats.min(), lons.max() - lons.min())
+    if max_range < 0.1: zoom_level = 9
+    elif max_range < 1: zoom_level = 7
+    elif max_range < 5: zoom_level = 5
+    elif max_range < 15: zoom_level = 3.5
+    else: zoom_level = 2.5
+    return lats.mean(), lons.mean(), zoom_level
+
+def focus_map_cluster():
+    """Clic sur un groupe : zoom sur son emprise, au niveau de détail suivant."""
+    event = st.session_state.get('collab_map')
+    points = event.selection.points if event else []
+    if points:
+        lat_min, lat_max, lon_min, lon_max = points[0]['customdata'][3:7]
+        st.session_state.map_focus = (lat_min, lat_max, lon_min, lon_max)
+        levels = list(MAP_LEVELS)
+        st.session_state.map_level = levels[levels.index(st.session_state.map_level) + 1]
+
+def reset_map_focus():
+    st.session_state.map_focus = None
+    st.session_state.map_level = "Monde"
+
+@st.cache_resource
+def load_structure_bits():
+    """Masque de bits des structures nantaises de chaque ligne (0 hors auteurs nantais)."""
+    return structure_bits(load_data(), STRUCTURES)
+
+@st.cache_resource
+def load_authors():
+    """Auteurs nantais par identifiant OpenAlex (nom, structures) pour la liste déroulante."""
+    return AuthorIndex(load_data(), load_structure_bits())
+
+def structure_counts(frame, names, key='doi'):
+    """Nombre de publications de frame par structure, en une passe sur les masques de bits."""
+    bits = struct_bits[np.asarray(frame.index, dtype=np.int64)]
+    masks = np.array([STRUCTURE_BIT[name] for name in names], dtype=np.uint64)
+    rows, cols = np.nonzero((bits[:, None] & masks[None, :]) != 0)
+    member = pd.DataFrame({'structure': np.asarray(names, dtype=object)[cols], key: frame[key].to_numpy()[rows]})
+    return member.groupby('structure')[key].nunique().reindex(names, fill_value=0)
+
+perf.mark("Chargement")
 df = load_data()
+facets = load_facets()
+struct_bits = load_structure_bits()
+authors = load_authors()
+# Moteur SQL optionnel des filtres (DATAVIZ_ENGINE=duckdb), voir studies/sql_engine.py
+engine = sql_engine.get()
 
 # --- SIDEBAR : FILTRES ---
+perf.mark("Filtres")
 st.sidebar.header("📅 Période")
 
 # Récupération de la période depuis l'URL
@@ -237,24 +318,37 @@ year_range = st.sidebar.slider(
 st.query_params["years"] = f"{year_range[0]}-{year_range[1]}"
 
 # On filtre par année immédiatement pour alléger la suite
-working_df = df[(df['year'] >= year_range[0]) & (df['year'] <= year_range[1])]
+# (masque sur les publications, combiné ensuite avec les autres filtres)
+def period_mask(years, author):
+    """Publications de la période (et de l'auteur nantais choisi)."""
+    works = facets.row_mask((df['year'] >= years[0]) & (df['year'] <= years[1]))
+    if author != "Tous les auteurs":
+        works &= facets.mask('author_id', author)
+    return works
+
+@perf.cache_data(max_entries=256)
+def facet_counts(name, years, author, parents=()):
+    """
+    Options d'une facette avec leur nombre de publications, pour un état des
+    filtres amont : période, auteur et couples (facette, valeur) de la cascade.
+    Mémoïsé : changer un filtre ne recalcule que les facettes qui en dépendent.
+    """
+    if engine is not None:
+        return collab_sql.facet_counts(engine, name, years, author, tuple((parent, (value,)) for parent, value in parents))
+    works = period_mask(years, author)
+    for parent, value in parents:
+        works &= facets.mask(parent, value)
+    return facets.counts(name, works)
 
-# On initialise working_df avec les données de base (ou filtrées par auteur si déjà sélectionné)
 if 'selected_author' not in st.session_state:
-    st.session_state.selected_author = st.query_params.get("author", "Tous les auteurs")
-
-if st.session_state.selected_author != "Tous les auteurs":
-    author_dois = working_df[working_df['author'] == st.session_state.selected_author]['doi'].unique()
-    working_df = working_df[working_df['doi'].isin(author_dois)]
+    # L'URL contient l'identifiant OpenAlex (les anciennes URL, le nom)
+    st.session_state.selected_author = authors.resolve(st.query_params.get("author", "Tous les auteurs"))
 
 # --- FILTRE PAYS (Dynamique selon l'auteur choisi) ---
 st.sidebar.header("🌍 Filtre Géographique")
-# On "explose" les pays pour avoir une liste propre d'individus
-all_countries_series = working_df['country'].str.split('|').explode().str.strip()
-valid_countries = all_countries_series[(all_countries_series != 'FR') & (all_countries_series != 'nan') & (all_countries_series != '')].dropna()
-
 # On trie les pays par nombre de publications décroissant
-country_counts = valid_countries.value_counts()
+country_counts = facet_counts('country', year_range, st.session_state.selected_author)
+country_counts = country_counts.drop(['FR', 'nan'], errors='ignore').sort_values(ascending=False, kind='stable')
 available_countries = list(country_counts.index)
 
 country_options = ["Tous les pays"] + available_countries
@@ -273,11 +367,10 @@ st.query_params["country"] = selected_country
 selected_inst = "Tous les établissements"
 if selected_country != "Tous les pays":
     # On n'affiche que les institutions du pays sélectionné
-    temp_inst_df = explode_parallel_cols(
-        working_df[working_df['country'].str.contains(selected_country, na=False)][['doi', 'institution', 'country']],
-        ['institution', 'country']
-    )
-    available_insts = sorted(temp_inst_df[temp_inst_df['country'] == selected_country]['institution'].unique())
+    country_insts = facet_counts('country_institution', year_range, st.session_state.selected_author,
+                                 (('country', selected_country),)).index
+    prefix = f"{selected_country}|"
+    available_insts = [v[len(prefix):] for v in country_insts if v.startswith(prefix)]
     inst_options = ["Tous les établissements"] + available_insts
     url_inst = st.query_params.get("inst", "Tous les établissements")
     inst_idx = inst_options.index(url_inst) if url_inst in inst_options else 0
@@ -286,10 +379,11 @@ if selected_country != "Tous les pays":
 
 # --- FILTRES THÉMATIQUES HIÉRARCHIQUES ---
 st.sidebar.header("🎯 Filtres Thématiques")
+# Chaque niveau ne dépend que des niveaux au-dessus de lui
+thematic_parents = ()
 
 # 1. Domaines
-all_domains = sorted(working_df['domains'].str.split('|').explode().str.strip().dropna().unique())
-if 'nan' in all_domains: all_domains.remove('nan')
+all_domains = [v for v in facet_counts('domains', year_range, st.session_state.selected_author).index if v != 'nan']
 domain_options = ["Tous les domaines"] + all_domains
 url_domain = st.query_params.get("domain", "Tous les domaines")
 domain_idx = domain_options.index(url_domain) if url_domain in domain_options else 0
@@ -297,11 +391,9 @@ selected_domain = st.sidebar.selectbox("Filtre par domaine :", domain_options, i
 st.query_params["domain"] = selected_domain
 
 # 2. Disciplines (Fields) - Cascade
-temp_df_fields = working_df
 if selected_domain != "Tous les domaines":
-    temp_df_fields = working_df[working_df['domains'].str.contains(selected_domain, na=False, regex=False)]
-all_fields = sorted(temp_df_fields['fields'].str.split('|').explode().str.strip().dropna().unique())
-if 'nan' in all_fields: all_fields.remove('nan')
+    thematic_parents += (('domains', selected_domain),)
+all_fields = [v for v in facet_counts('fields', year_range, st.session_state.selected_author, thematic_parents).index if v != 'nan']
 field_options = ["Toutes les disciplines"] + all_fields
 url_field = st.query_params.get("field", "Toutes les disciplines")
 field_idx = field_options.index(url_field) if url_field in field_options else 0
@@ -309,11 +401,9 @@ selected_field = st.sidebar.selectbox("Filtre par discipline :", field_options,
 st.query_params["field"] = selected_field
 
 # 3. Sous-disciplines (Subfields) - Cascade
-temp_df_subfields = temp_df_fields
 if selected_field != "Toutes les disciplines":
-    temp_df_subfields = temp_df_fields[temp_df_fields['fields'].str.contains(selected_field, na=False, regex=False)]
-all_subfields = sorted(temp_df_subfields['subfields'].str.split('|').explode().str.strip().dropna().unique())
-if 'nan' in all_subfields: all_subfields.remove('nan')
+    thematic_parents += (('fields', selected_field),)
+all_subfields = [v for v in facet_counts('subfields', year_range, st.session_state.selected_author, thematic_parents).index if v != 'nan']
 subfield_options = ["Toutes les sous-disciplines"] + all_subfields
 url_subfield = st.query_params.get("subfield", "Toutes les sous-disciplines")
 subfield_idx = subfield_options.index(url_subfield) if url_subfield in subfield_options else 0
@@ -321,11 +411,9 @@ selected_subfield = st.sidebar.selectbox("Filtre par sous-discipline :", subfiel
 st.query_params["subfield"] = selected_subfield
 
 # 4. Sujets (Topics) - Cascade
-temp_df_topics = temp_df_subfields
 if selected_subfield != "Toutes les sous-disciplines":
-    temp_df_topics = temp_df_subfields[temp_df_subfields['subfields'].str.contains(selected_subfield, na=False, regex=False)]
-all_topics = sorted(temp_df_topics['topics'].str.split('|').explode().str.strip().dropna().unique())
-if 'nan' in all_topics: all_topics.remove('nan')
+    thematic_parents += (('subfields', selected_subfield),)
+all_topics = [v for v in facet_counts('topics', year_range, st.session_state.selected_author, thematic_parents).index if v != 'nan']
 topic_options = ["Tous les sujets"] + all_topics
 url_topic = st.query_params.get("topic", "Tous les sujets")
 topic_idx = topic_options.index(url_topic) if url_topic in topic_options else 0
@@ -367,17 +455,11 @@ st.query_params["unit"] = selected_unit
 st.sidebar.header("👤 Chercheur Nantais")
 # La liste des auteurs se restreint à l'unité choisie ou au pôle choisi
 if selected_unit != "Toutes les unités":
-    unit_id = NANTES_LABEL_TO_ID[selected_unit]
-    unit_authors_df = df[(df['is_nantes'] == True) & (df['inst_id'].str.contains(unit_id, na=False, regex=False))]
-    nantes_authors_list = sorted(unit_authors_df['author'].unique())
+    nantes_authors_list = authors.options(STRUCTURE_BIT[selected_unit])
 elif selected_pole != "Tous les pôles":
-    pole_units = POLES_MAP[selected_pole]
-    pole_ids = [NANTES_LABEL_TO_ID[u] for u in pole_units if u in NANTES_LABEL_TO_ID]
-    regex_pattern = '|'.join(pole_ids)
-    unit_authors_df = df[(df['is_nantes'] == True) & (df['inst_id'].str.contains(regex_pattern, na=False, regex=True))]
-    nantes_authors_list = sorted(unit_authors_df['author'].unique())
+    nantes_authors_list = authors.options(STRUCTURE_BIT[selected_pole])
 else:
-    nantes_authors_list = sorted(df[df['is_nantes'] == True]['author'].unique())
+    nantes_authors_list = authors.options()
 
 author_options = ["Tous les auteurs"] + nantes_authors_list
 if st.session_state.selected_author not in author_options:
@@ -386,6 +468,7 @@ if st.session_state.selected_author not in author_options:
 selected_author = st.sidebar.selectbox(
     "Filtrer par auteur nantais :",
     author_options,
+    format_func=lambda a: a if a == "Tous les auteurs" else authors.label(a),
     key="selected_author"
 )
 st.query_params["author"] = selected_author
@@ -417,73 +500,61 @@ st.sidebar.markdown("---")
 st.sidebar.info("🔗 L'URL de votre navigateur contient vos filtres actuels. Copiez-la pour partager cette vue.")
 
 # --- LOGIQUE DE FILTRAGE FINAL ---
-filtered_df = working_df.copy()
-
-# Filtre par année
-filtered_df = filtered_df[(filtered_df['year'] >= year_range[0]) & (filtered_df['year'] <= year_range[1])]
-
-# Filtre par nombre d'auteurs
-if selected_limit_val < 1000000:
-    filtered_df = filtered_df[filtered_df['authors_count'] <= selected_limit_val]
+perf.mark("Filtrage")
+# Chaque filtre donne un masque de publications (index des facettes) ;
+# le tableau n'est découpé qu'une fois, sur leur intersection.
+work_filters = []  # (facette, valeurs acceptées)
 
 # Filtre par pays
 if selected_country != "Tous les pays":
-    c_dois = filtered_df[filtered_df['country'].str.contains(selected_country, na=False)]['doi'].unique()
-    filtered_df = filtered_df[filtered_df['doi'].isin(c_dois)]
-    
+    work_filters.append(('country', (selected_country,)))
+
 if selected_inst != "Tous les établissements":
-    i_dois = filtered_df[filtered_df['institution'].str.contains(selected_inst, na=False, regex=False)]['doi'].unique()
-    filtered_df = filtered_df[filtered_df['doi'].isin(i_dois)]
+    work_filters.append(('institution', (selected_inst,)))
 
 # Filtres thématiques
 if selected_domain != "Tous les domaines":
-    d_dois = filtered_df[filtered_df['domains'].str.contains(selected_domain, na=False, regex=False)]['doi'].unique()
-    filtered_df = filtered_df[filtered_df['doi'].isin(d_dois)]
+    work_filters.append(('domains', (selected_domain,)))
 
 if selected_field != "Toutes les disciplines":
-    f_dois = filtered_df[filtered_df['fields'].str.contains(selected_field, na=False, regex=False)]['doi'].unique()
-    filtered_df = filtered_df[filtered_df['doi'].isin(f_dois)]
+    work_filters.append(('fields', (selected_field,)))
 
 if selected_subfield != "Toutes les sous-disciplines":
-    s_dois = filtered_df[filtered_df['subfields'].str.contains(selected_subfield, na=False, regex=False)]['doi'].unique()
-    filtered_df = filtered_df[filtered_df['doi'].isin(s_dois)]
+    work_filters.append(('subfields', (selected_subfield,)))
 
 if selected_topic != "Tous les sujets":
-    t_dois = filtered_df[filtered_df['topics'].str.contains(selected_topic, na=False, regex=False)]['doi'].unique()
-    filtered_df = filtered_df[filtered_df['doi'].isin(t_dois)]
+    work_filters.append(('topics', (selected_topic,)))
 
 # Filtre par établissement
 if selected_comp != "Tous les établissements":
-    comp_id = COMPONENTS_MAP[selected_comp]
-    comp_dois = filtered_df[
-        (filtered_df['is_nantes'] == True) &
-        (filtered_df['inst_id'].str.contains(comp_id, na=False, regex=False))
-    ]['doi'].unique()
-    filtered_df = filtered_df[filtered_df['doi'].isin(comp_dois)]
+    work_filters.append(('nantes_inst_id', (COMPONENTS_MAP[selected_comp],)))
 
 # Filtre structure nantaise (Pôle / Unité)
 if selected_unit != "Toutes les unités":
-    unit_id = NANTES_LABEL_TO_ID[selected_unit]
-    unit_dois = filtered_df[
-        (filtered_df['is_nantes'] == True) &
-        (filtered_df['inst_id'].str.contains(unit_id, na=False, regex=False, case=False))
-    ]['doi'].unique()
-    filtered_df = filtered_df[filtered_df['doi'].isin(unit_dois)]
+    work_filters.append(('nantes_inst_id', (NANTES_LABEL_TO_ID[selected_unit],)))
 elif selected_pole != "Tous les pôles":
-    pole_units = POLES_MAP[selected_pole]
-    pole_ids = [NANTES_LABEL_TO_ID[u] for u in pole_units if u in NANTES_LABEL_TO_ID]
-    regex_pattern = '|'.join(pole_ids)
-    unit_dois = filtered_df[
-        (filtered_df['is_nantes'] == True) &
-        (filtered_df['inst_id'].str.contains(regex_pattern, na=False, regex=True))
-    ]['doi'].unique()
-    filtered_df = filtered_df[filtered_df['doi'].isin(unit_dois)]
+    pole_ids = [NANTES_LABEL_TO_ID[u] for u in POLES_MAP[selected_pole] if u in NANTES_LABEL_TO_ID]
+    work_filters.append(('nantes_inst_id', tuple(pole_ids)))
+
+# Filtre par nombre d'auteurs
+author_limit = selected_limit_val if selected_limit_val < 1000000 else None
+
+if engine is not None:
+    selected_works = collab_sql.work_mask(engine, facets.works, year_range, selected_author, author_limit, tuple(work_filters))
+else:
+    selected_works = period_mask(year_range, selected_author)
+    if author_limit is not None:
+        selected_works &= facets.row_mask(df['authors_count'] <= author_limit)
+    for facet, values in work_filters:
+        selected_works &= facets.mask(facet, *values)
+
+filtered_df = facets.select(df, selected_works)
 
 display_df = filtered_df
 
 # --- AFFICHAGE DES RÉSULTATS ---
 # Construction dynamique du titre en fonction des filtres
-structure_label = selected_author if selected_author != 'Tous les auteurs' else \
+structure_label = authors.label(selected_author) if selected_author != 'Tous les auteurs' else \
                  selected_unit if selected_unit != 'Toutes les unités' else \
                  selected_pole if selected_pole != 'Tous les pôles' else \
                  selected_comp if selected_comp != 'Tous les établissements' else \
@@ -514,18 +585,21 @@ Ce tableau de bord présente les publications scientifiques co-signées par des
 """)
 
 view_options = ["Institutions", "Carte", "Dataviz"]
-url_mode = st.query_params.get("mode", "Institutions")
-mode_idx = view_options.index(url_mode) if url_mode in view_options else 0
+# Mode initial lu dans l'URL ; ensuite, le widget garde son état (clé fixe)
+if 'view_mode' not in st.session_state:
+    url_mode = st.query_params.get("mode", "Institutions")
+    st.session_state.view_mode = url_mode if url_mode in view_options else view_options[0]
 
 view_mode = st.radio(
     "Mode d'affichage :",
     options=view_options,
-    index=mode_idx,
-    horizontal=True
+    horizontal=True,
+    key='view_mode'
 )
 st.query_params["mode"] = view_mode
 
 st.write("---")
+perf.mark(f"Vue {view_mode}")
 
 if view_mode == "Dataviz":
     # 1. PAYS PARTENAIRES
@@ -564,12 +638,8 @@ if view_mode == "Dataviz":
 
     # 3. ÉTABLISSEMENTS NANTAIS
     st.write("### 🏫 Établissements nantais")
-    comp_stats = []
-    for name, cid in COMPONENTS_MAP.items():
-        count = display_df[(display_df['is_nantes'] == True) & (display_df['inst_id'].str.contains(cid, na=False))]['doi'].nunique()
-        if count > 0:
-            comp_stats.append({'Établissement': name, 'Publications': count})
-    df_comp = pd.DataFrame(comp_stats)
+    comp_counts = structure_counts(display_df, list(COMPONENTS_MAP))
+    df_comp = comp_counts[comp_counts > 0].rename_axis('Établissement').reset_index(name='Publications')
     if not df_comp.empty:
         fig_comp = px.bar(df_comp.sort_values('Publications', ascending=False), x='Publications', y='Établissement', orientation='h', color='Publications', color_continuous_scale='Greens')
         fig_comp.update_layout(yaxis={'categoryorder':'total ascending'}, showlegend=False)
@@ -579,14 +649,8 @@ if view_mode == "Dataviz":
 
     # 4. PÔLES
     st.write("### 🧬 Pôles")
-    pole_stats = []
-    for p_name, p_units in POLES_MAP.items():
-        p_ids = [NANTES_LABEL_TO_ID[u] for u in p_units if u in NANTES_LABEL_TO_ID]
-        regex = '|'.join(p_ids)
-        count = display_df[(display_df['is_nantes'] == True) & (display_df['inst_id'].str.contains(regex, na=False))]['doi'].nunique()
-        if count > 0:
-            pole_stats.append({'Pôle': p_name, 'Publications': count})
-    df_pole = pd.DataFrame(pole_stats)
+    pole_counts = structure_counts(display_df, list(POLES_MAP))
+    df_pole = pole_counts[pole_counts > 0].rename_axis('Pôle').reset_index(name='Publications')
     if not df_pole.empty:
         fig_p = px.bar(df_pole.sort_values('Publications', ascending=False), x='Publications', y='Pôle', orientation='h', color='Publications', color_continuous_scale='Purples')
         fig_p.update_layout(yaxis={'categoryorder':'total ascending'}, showlegend=False)
@@ -596,7 +660,7 @@ if view_mode == "Dataviz":
 
     # 5. UNITÉS DE RECHERCHE
     st.write("### 🏢 Unités de recherche (Labos)")
-    nantes_labs_df = display_df[display_df['is_nantes'] == True].copy()
+    nantes_labs_df = display_df[display_df['is_nantes'] == True]
     nantes_labs_df = nantes_labs_df.assign(lab=nantes_labs_df['institution'].str.split('|')).explode('lab')
     nantes_labs_df['lab'] = nantes_labs_df['lab'].str.strip()
     official_labs = set(NANTES_MAP.values())
@@ -652,23 +716,12 @@ if view_mode == "Dataviz":
 
 elif view_mode == "Institutions":
     # Mode : Universités partenaires
-    # On utilise explode_parallel_cols pour avoir une liste propre d'institutions et leurs pays
-    partner_inst_df = explode_parallel_cols(
-        display_df[display_df['is_nantes'] == False][['doi', 'institution', 'country']],
-        ['institution', 'country']
-    )
-    # On nettoie et on filtre (on ne garde que l'étranger, Nantes est la référence)
-    partner_inst_df = partner_inst_df[partner_inst_df['institution'] != ""]
-    partner_inst_df = partner_inst_df[(partner_inst_df['country'] != "FR") & (partner_inst_df['country'] != "nan") & (partner_inst_df['country'] != "")]
-    
-    if selected_country != "Tous les pays":
-        partner_inst_df = partner_inst_df[partner_inst_df['country'] == selected_country]
-    
-    inst_stats = partner_inst_df.groupby('institution', observed=True)['doi'].nunique().reset_index()
-    inst_stats.columns = ['Institution', 'Publications']
-    # Sécurité supplémentaire : on retire les lignes à 0 publications (problème de catégories sparse)
-    inst_stats = inst_stats[inst_stats['Publications'] > 0]
-    inst_stats = inst_stats.sort_values('Publications', ascending=False)
+    # Table des partenaires étrangers précalculée (Nantes est la référence) :
+    # on ne fait que compter les publications retenues par les filtres
+    partners = load_partners()
+    partner_country = selected_country if selected_country != "Tous les pays" else None
+    with perf.section("Institutions : comptage"):
+        inst_stats = partners.institution_counts(selected_works, partner_country)
     
     total_insts = len(inst_stats)
     st.write(f"### 🏫 Institutions ({total_insts})")
@@ -687,31 +740,35 @@ elif view_mode == "Institutions":
     else:
         insts_to_show = inst_stats
 
+    # Regroupements faits une seule fois pour la page : publications par
+    # institution affichée, et lignes de chaque publication
+    shown_inst_works = partners.institution_works(insts_to_show['Institution'], selected_works, partner_country)
+    pub_rows = group_rows(display_df, 'work_id')
+
     for inst_idx, (_, row) in enumerate(insts_to_show.iterrows()):
         inst_name = row['Institution']
         pub_count = row['Publications']
         
         with st.expander(f"🏫 {inst_name} ({pub_count} publications)"):
-            inst_dois = partner_inst_df[partner_inst_df['institution'] == inst_name]['doi'].unique()
-            relevant_df = display_df[display_df['doi'].isin(inst_dois)]
+            relevant_df = rows_for(display_df, pub_rows, shown_inst_works[inst_name])
             
             c1, c2 = st.columns(2)
             with c1:
                 st.write("**👤 Chercheurs nantais impliqués :**")
-                nantes_res_stats = relevant_df[relevant_df['is_nantes'] == True].groupby('author', observed=True)['doi'].nunique().sort_values(ascending=False).reset_index()
+                nantes_res_stats = relevant_df[relevant_df['is_nantes'] == True].groupby('author', observed=True)['work_id'].nunique().sort_values(ascending=False).reset_index()
                 nantes_res_stats.columns = ['author', 'count']
                 nantes_res_stats = nantes_res_stats[nantes_res_stats['count'] > 0]
                 res_list = [f"{r['author']} ({r['count']})" for _, r in nantes_res_stats.head(15).iterrows()]
                 st.write(", ".join(res_list) + ("..." if len(nantes_res_stats) > 15 else ""))
                 
                 st.write("**🏢 Labos nantais impliqués :**")
-                nantes_labs_df = relevant_df[relevant_df['is_nantes'] == True].copy()
+                nantes_labs_df = relevant_df[relevant_df['is_nantes'] == True]
                 nantes_labs_df = nantes_labs_df.assign(lab=nantes_labs_df['institution'].str.split('|')).explode('lab')
                 nantes_labs_df['lab'] = nantes_labs_df['lab'].str.strip()
                 
                 # Filtrer pour ne garder QUE les labos officiels de la liste NANTES_MAP
                 official_labs = set(NANTES_MAP.values())
-                lab_stats = nantes_labs_df[nantes_labs_df['lab'].isin(official_labs)].groupby('lab', observed=True)['doi'].nunique().sort_values(ascending=False).reset_index()
+                lab_stats = nantes_labs_df[nantes_labs_df['lab'].isin(official_labs)].groupby('lab', observed=True)['work_id'].nunique().sort_values(ascending=False).reset_index()
                 lab_stats.columns = ['lab', 'count']
                 lab_list = [f"{r['lab']} ({r['count']})" for _, r in lab_stats[lab_stats['count'] > 0].iterrows()]
                 st.write(", ".join(lab_list) if lab_list else "_Aucun labo officiel identifié_")
@@ -721,8 +778,8 @@ elif view_mode == "Institutions":
             
             st.write("---")
             st.write("**📄 Publications associées :**")
-            sorted_dois = relevant_df[['doi', 'year']].drop_duplicates().sort_values('year', ascending=False)['doi'].values
-            total_pubs = len(sorted_dois)
+            sorted_works = relevant_df[['work_id', 'year']].drop_duplicates().sort_values('year', ascending=False)['work_id'].values
+            total_pubs = len(sorted_works)
             PUB_PAGE_SIZE = 10
             total_pub_pages = max(1, (total_pubs - 1) // PUB_PAGE_SIZE + 1)
             if total_pub_pages > 1:
@@ -731,98 +788,86 @@ elif view_mode == "Institutions":
                     min_value=1, max_value=total_pub_pages, step=1, value=1,
                     key=f"pub_page_inst_{inst_idx}"
                 )
-                dois_slice = sorted_dois[(pub_page-1)*PUB_PAGE_SIZE : pub_page*PUB_PAGE_SIZE]
+                works_slice = sorted_works[(pub_page-1)*PUB_PAGE_SIZE : pub_page*PUB_PAGE_SIZE]
             else:
-                dois_slice = sorted_dois
-            for pub_doi in dois_slice:
-                pub_data = relevant_df[relevant_df['doi'] == pub_doi]
-                if not pub_data.empty:
-                    render_publication(pub_doi, pub_data, selected_author, selected_country)
+                works_slice = sorted_works
+            for work_id in works_slice:
+                pub_data = display_df.iloc[pub_rows[work_id]]
+                render_publication(pub_data['doi'].iloc[0], pub_data, selected_author, selected_country)
 
 elif view_mode == "Carte":
     st.write("### 🗺️ Carte des collaborations")
     st.markdown("Cliquez sur une université sur la carte ci-dessous pour filtrer et afficher les détails en-dessous.")
     
-    # 1. Extraction et formatage des données géographiques
-    df_copy = display_df[display_df['is_nantes'] == False].copy()
+    # 1. Emplacements et grilles précalculés (PartnerTable) : on n'envoie au
+    # navigateur que les points du niveau de détail et de la zone choisis
+    partners = load_partners()
+    partner_country = selected_country if selected_country != "Tous les pays" else None
     
-    map_df = explode_parallel_cols(
-        df_copy[['doi', 'institution', 'lat', 'lon', 'country']].rename(columns={'country': 'country_code'}),
-        ['institution', 'lat', 'lon', 'country_code']
-    )
-    # On ne garde que les partenaires étrangers sur la carte
-    map_df = map_df[(map_df['institution'] != '') & (map_df['lat'] != '') & (map_df['lon'] != '') & (map_df['country_code'] != 'FR')]
+    # Le zoom sur un groupe et le niveau de détail ne valent que pour l'état des
+    # filtres où ils ont été choisis : tout changement de filtre repart de la vue d'ensemble
+    map_filters = (tuple(year_range), selected_author, author_limit, tuple(work_filters))
+    if st.session_state.get('map_filters') != map_filters or 'map_level' not in st.session_state:
+        st.session_state.map_filters = map_filters
+        st.session_state.map_focus = None
+        st.session_state.map_level = "Institutions" if partner_country else "Monde"
+    focus = st.session_state.get('map_focus')  # emprise (lat_min, lat_max, lon_min, lon_max) d'un groupe cliqué
     
-    # Filtrer par pays si sélectionné
-    if selected_country != "Tous les pays":
-        map_df = map_df[map_df['country_code'] == selected_country]
-
-    # Conversion numérique pour map_df aussi (important pour le filtrage au clic)
-    map_df['lat'] = pd.to_numeric(map_df['lat'], errors='coerce')
-    map_df['lon'] = pd.to_numeric(map_df['lon'], errors='coerce')
-    map_df = map_df.dropna(subset=['lat', 'lon'])
+    lod_col, reset_col = st.columns([3, 1])
+    with lod_col:
+        map_level = st.radio("Niveau de détail :", list(MAP_LEVELS), horizontal=True, key='map_level')
+    with reset_col:
+        if focus is not None:
+            st.button("🌍 Vue d'ensemble", on_click=reset_map_focus)
+    grid_size = MAP_LEVELS[map_level]
+    
+    with perf.section("Carte : agrégation"):
+        if grid_size:
+            points = partners.cluster_counts(grid_size, selected_works, partner_country, focus)
+        else:
+            points = partners.location_counts(selected_works, partner_country, focus)
 
-    if map_df.empty:
+    if points.empty:
         st.info("Aucune donnée géographique disponible pour cette sélection.")
     else:
-        # 1. Aggrégation par institution
-        inst_stats = map_df.groupby(['institution', 'lat', 'lon', 'country_code']).agg({
-            'doi': 'nunique'
-        }).reset_index()
-        
-        inst_stats.columns = ['institution', 'lat', 'lon', 'country_code', 'count']
-        inst_stats['lat'] = pd.to_numeric(inst_stats['lat'], errors='coerce')
-        inst_stats['lon'] = pd.to_numeric(inst_stats['lon'], errors='coerce')
-        inst_stats = inst_stats.dropna(subset=['lat', 'lon'])
         # Conversion CRITIQUE en string pour éviter l'erreur "U.replace is not a function" dans Plotly JS
-        inst_stats['label_text'] = inst_stats['count'].astype(str)
-        inst_stats['pays_full'] = inst_stats['country_code'].apply(get_country_name)
-
-        # 2. Gestion des superpositions (Jitter)
-        # Si plusieurs badges sont au même endroit, on les décale légèrement pour qu'ils soient tous visibles
-        inst_stats['original_lat'] = inst_stats['lat']
-        inst_stats['original_lon'] = inst_stats['lon']
-        inst_stats['pos_id'] = inst_stats['lat'].astype(str) + inst_stats['lon'].astype(str)
-        counts = inst_stats.groupby('pos_id').cumcount()
-        
-        import numpy as np
-        mask = counts > 0
-        angle = counts * (2 * np.pi / 8)
-        radius = 0.008 * (1 + counts // 8)
-        inst_stats.loc[mask, 'lat'] += np.sin(angle[mask]) * radius[mask]
-        inst_stats.loc[mask, 'lon'] += np.cos(angle[mask]) * radius[mask]
-
-        # 2b. Calcul du centre et du zoom
-        if selected_country != "Tous les pays" and not inst_stats.empty:
-            center_lat = inst_stats['original_lat'].mean()
-            center_lon = inst_stats['original_lon'].mean()
-            lat_range = inst_stats['original_lat'].max() - inst_stats['original_lat'].min()
-            lon_range = inst_stats['original_lon'].max() - inst_stats['original_lon'].min()
-            max_range = max(lat_range, lon_range)
-            if max_range < 0.1: zoom_level = 9
-            elif max_range < 1: zoom_level = 7
-            elif max_range < 5: zoom_level = 5
-            elif max_range < 15: zoom_level = 3.5
-            else: zoom_level = 2.5
+        points['label_text'] = points['count'].astype(str)
+        if grid_size:
+            points['name'] = points['institutions'].astype(str) + " institution(s)"
+            points['detail'] = "Cliquez pour zoomer sur ce groupe"
+            custom_data = ['name', 'detail', 'label_text', 'lat_min', 'lat_max', 'lon_min', 'lon_max']
+            lat_col, lon_col = 'lat', 'lon'
+        else:
+            points['name'] = points['institution']
+            points['detail'] = points['country'].map(get_country_name)
+            custom_data = ['name', 'detail', 'label_text', 'loc']
+            # Position décalée précalculée pour les badges superposés
+            lat_col, lon_col = 'map_lat', 'map_lon'
+
+        # 2. Calcul du centre et du zoom
+        if partner_country or focus is not None:
+            center_lat, center_lon, zoom_level = map_view(points['lat'], points['lon'])
         else:
             center_lat, center_lon, zoom_level = 20, 0, 0.5
         
-        # 3. Génération de la carte avec badges (Markers + Text)
+        # 3. Génération de la carte avec badges (Markers + Text) ; scattermapbox est rendu en WebGL
         fig_map = px.scatter_mapbox(
-            inst_stats,
-            lat='lat',
-            lon='lon',
-            hover_name='institution',
+            points,
+            lat=lat_col,
+            lon=lon_col,
+            hover_name='name',
             text='label_text',
-            custom_data=['institution', 'pays_full', 'label_text', 'original_lat', 'original_lon'],
+            custom_data=custom_data,
             zoom=zoom_level,
             center=dict(lat=center_lat, lon=center_lon),
             mapbox_style="open-street-map"
         )
         
+        # Groupes : taille du badge selon le nombre de publications
+        marker_size = (18 + 6 * np.log1p(points['count'])).round(1).tolist() if grid_size else 25
         fig_map.update_traces(
             mode='markers+text',
-            marker=dict(size=25, color='#004d5b'),
+            marker=dict(size=marker_size, color='#004d5b'),
             textposition='middle center',
             textfont=dict(size=10, color='white'),
             hovertemplate="<b>%{customdata[0]}</b><br>" +
@@ -837,51 +882,50 @@ elif view_mode == "Carte":
         )
         
         try:
-            event = st.plotly_chart(fig_map, width='stretch', on_select="rerun", selection_mode=("points"), config={'scrollZoom': True})
+            with perf.section("Carte : envoi de la figure"):
+                event = st.plotly_chart(fig_map, width='stretch', key='collab_map',
+                                        on_select=focus_map_cluster if grid_size else "rerun",
+                                        selection_mode=("points"), config={'scrollZoom': True})
         except Exception:
             st.plotly_chart(fig_map, width='stretch', config={'scrollZoom': True})
             event = None
         
         st.write("---")
         
-        # Logique d'affichage des détails après clic
-        if event and hasattr(event, 'selection') and len(event.selection.points) > 0:
+        # Logique d'affichage des détails après clic (niveau Institutions)
+        if not grid_size and event and hasattr(event, 'selection') and len(event.selection.points) > 0:
             selected_point = event.selection.points[0]
             # On récupère les infos du customdata
-            cdata = selected_point.get('customdata', ["", "", "", 0, 0])
+            cdata = selected_point.get('customdata', ["", "", "", -1])
             sel_name = cdata[0]
-            orig_lat = cdata[3]
-            orig_lon = cdata[4]
+            sel_loc = int(cdata[3])
             
             st.write(f"### 📍 Détail de l'institution")
             
-            # On filtre précisément par nom ET coordonnées originales pour éviter les mélanges
-            inst_dois = map_df[
-                (map_df['institution'] == sel_name) & 
-                (map_df['lat'] == orig_lat) & 
-                (map_df['lon'] == orig_lon)
-            ]['doi'].unique()
-            relevant_df = display_df[display_df['doi'].isin(inst_dois)]
-            pub_count = len(inst_dois)
+            # Emplacement précis (nom ET coordonnées) pour éviter les mélanges
+            inst_works = partners.location_works(sel_loc, selected_works)
+            relevant_df = rows_for(display_df, group_rows(display_df, 'work_id'), inst_works)
+            pub_rows = group_rows(relevant_df, 'work_id')
+            pub_count = len(inst_works)
             
             with st.expander(f"🏫 {sel_name} ({pub_count} publications)", expanded=True):
                     c1, c2 = st.columns(2)
                     with c1:
                         st.write("**👤 Chercheurs nantais impliqués :**")
-                        nantes_res_stats = relevant_df[relevant_df['is_nantes'] == True].groupby('author', observed=True)['doi'].nunique().sort_values(ascending=False).reset_index()
+                        nantes_res_stats = relevant_df[relevant_df['is_nantes'] == True].groupby('author', observed=True)['work_id'].nunique().sort_values(ascending=False).reset_index()
                         nantes_res_stats.columns = ['author', 'count']
                         nantes_res_stats = nantes_res_stats[nantes_res_stats['count'] > 0]
                         res_list = [f"{r['author']} ({r['count']})" for _, r in nantes_res_stats.head(15).iterrows()]
                         st.write(", ".join(res_list) + ("..." if len(nantes_res_stats) > 15 else ""))
                         
                         st.write("**🏢 Labos nantais impliqués :**")
-                        nantes_labs_df = relevant_df[relevant_df['is_nantes'] == True].copy()
+                        nantes_labs_df = relevant_df[relevant_df['is_nantes'] == True]
                         nantes_labs_df = nantes_labs_df.assign(lab=nantes_labs_df['institution'].str.split('|')).explode('lab')
                         nantes_labs_df['lab'] = nantes_labs_df['lab'].str.strip()
                         
                         # Filtrer pour ne garder QUE les labos officiels de la liste NANTES_MAP
                         official_labs = set(NANTES_MAP.values())
-                        lab_stats = nantes_labs_df[nantes_labs_df['lab'].isin(official_labs)].groupby('lab', observed=True)['doi'].nunique().sort_values(ascending=False).reset_index()
+                        lab_stats = nantes_labs_df[nantes_labs_df['lab'].isin(official_labs)].groupby('lab', observed=True)['work_id'].nunique().sort_values(ascending=False).reset_index()
                         lab_stats.columns = ['lab', 'count']
                         lab_list = [f"{r['lab']} ({r['count']})" for _, r in lab_stats[lab_stats['count'] > 0].iterrows()]
                         st.write(", ".join(lab_list) if lab_list else "_Aucun labo officiel identifié_")
@@ -891,15 +935,18 @@ elif view_mode == "Carte":
                     
                     st.write("---")
                     st.write("**📄 Publications associées :**")
-                    sorted_dois = relevant_df[['doi', 'year']].drop_duplicates().sort_values('year', ascending=False)['doi'].values
+                    sorted_works = relevant_df[['work_id', 'year']].drop_duplicates().sort_values('year', ascending=False)['work_id'].values
                     
                     # On affiche les publications sans pagination complexe ici pour plus de clarté
-                    for pub_doi in sorted_dois[:10]: # On montre les 10 dernières
-                        pub_data = relevant_df[relevant_df['doi'] == pub_doi]
-                        if not pub_data.empty:
-                            render_publication(pub_doi, pub_data, selected_author, selected_country)
+                    for work_id in sorted_works[:10]: # On montre les 10 dernières
+                        pub_data = relevant_df.iloc[pub_rows[work_id]]
+                        render_publication(pub_data['doi'].iloc[0], pub_data, selected_author, selected_country)
                     
-                    if len(sorted_dois) > 10:
-                        st.info(f"Et {len(sorted_dois)-10} autres publications...")
+                    if len(sorted_works) > 10:
+                        st.info(f"Et {len(sorted_works)-10} autres publications...")
+        elif grid_size:
+            st.info("👆 Cliquez sur un groupe pour zoomer sur ses institutions.")
         else:
-            st.info("👆 Cliquez sur une bulle de la carte pour afficher les détails individuels des universités à cet emplacement.")
\ No newline at end of file
+            st.info("👆 Cliquez sur une bulle de la carte pour afficher les détails individuels des universités à cet emplacement.")
+
+perf.panel()
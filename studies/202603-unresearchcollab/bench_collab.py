@@ -0,0 +1,169 @@
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from collab_data import explode_parallel_cols
+
+# =============================================================================
+# BENCHMARK — explode_parallel_cols
+#
+# 1. Vérifie sur des tables aléatoires (lignes vides, NaN, espaces, colonnes
+#    de longueurs différentes) et sur les données réelles que la version
+#    vectorisée donne exactement le même résultat que l'implémentation
+#    ligne à ligne d'origine (reference_explode_parallel_cols).
+# 2. Mesure les deux versions sur les données répliquées 1x, 10x et 100x.
+#
+# Sans --data (ou si le parquet est absent), les mesures portent sur une
+# table synthétique de même forme que cooperations_nantesu.parquet
+# (synthetic_coop, graine fixe) : le benchmark ne dépend pas des données
+# extraites, qui ne sont pas versionnées.
+# =============================================================================
+
+DATA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cooperations_nantesu.parquet")
+
+# Appels faits par app.py (sous-filtre établissement, vue Institutions, vue Carte)
+APP_CALLS = [
+    (['doi', 'institution', 'country'], ['institution', 'country']),
+    (['doi', 'institution', 'lat', 'lon', 'country'], ['institution', 'lat', 'lon', 'country']),
+]
+
+
+def reference_explode_parallel_cols(df, cols, id_col='doi'):
+    """Implémentation d'origine (boucle Python ligne à ligne), conservée comme référence."""
+    if df.empty:
+        return pd.DataFrame(columns=[id_col] + cols)
+    split = {c: df[c].fillna('').astype(str).str.split('|') for c in cols}
+    max_len = pd.concat([s.apply(len) for s in split.values()], axis=1).max(axis=1)
+
+    rows = []
+    for idx in df.index:
+        n = max_len[idx]
+        parts = {c: (split[c][idx] + [''] * n)[:n] for c in cols}
+        for i in range(n):
+            row_data = {id_col: df.at[idx, id_col]}
+            for c in cols:
+                row_data[c] = parts[c][i].strip()
+            rows.append(row_data)
+    return pd.DataFrame(rows)
+
+
+def random_frame(rng, n_rows, n_cols):
+    tokens = np.array(['A', 'B', ' C ', 'Université X', '', '47.2', '-1.55', 'FR', 'US'])
+    def cell():
+        r = rng.random()
+        if r < 0.05:
+            return None
+        if r < 0.1:
+            return ''
+        return '|'.join(rng.choice(tokens, rng.integers(1, 5)))
+    cols = [f"c{j}" for j in range(n_cols)]
+    data = {c: [cell() for _ in range(n_rows)] for c in cols}
+    # Index non contigu, comme après un filtrage
+    index = rng.choice(10 * n_rows + 1, n_rows, replace=False)
+    return pd.DataFrame({'doi': [f"10.1/{i}" for i in range(n_rows)], **data}, index=index), cols
+
+
+def synthetic_coop(n_works, seed=0):
+    """
+    Lignes auteur × publication au format d'extract_coop.py : institutions,
+    pays et coordonnées en listes parallèles séparées par '|' (longueurs
+    parfois différentes, cellules vides ou manquantes).
+    """
+    rng = np.random.default_rng(seed)
+    countries = np.array(['FR', 'US', 'DE', 'GB', 'IT', 'ES', 'CN', 'JP', 'CA', 'BR'])
+    n_authors = rng.integers(2, 8, n_works)
+    work = np.repeat(np.arange(n_works), n_authors)
+    n = len(work)
+    is_nantes = rng.random(n) < 0.4
+    n_inst = rng.integers(1, 4, n)
+
+    def parallel(make):
+        return ['|'.join(make(i, k) for k in range(m)) for i, m in enumerate(n_inst)]
+
+    inst_codes = rng.integers(0, 2000, (n, 3))
+    country_codes = rng.integers(0, len(countries), (n, 3))
+    lat = rng.uniform(-60, 70, (n, 3)).round(4)
+    lon = rng.uniform(-180, 180, (n, 3)).round(4)
+    df = pd.DataFrame({
+        'doi': [f"10.5555/w{w}" for w in work],
+        'institution': parallel(lambda i, k: f"Université {inst_codes[i, k]}"),
+        'lat': parallel(lambda i, k: str(lat[i, k])),
+        'lon': parallel(lambda i, k: str(lon[i, k])),
+        'country': parallel(lambda i, k: 'FR' if is_nantes[i] else countries[country_codes[i, k]]),
+        'is_nantes': is_nantes,
+    })
+    # Coordonnées inconnues (liste plus courte ou cellule vide) et valeurs manquantes
+    missing = rng.random(n)
+    df.loc[missing < 0.05, 'lat'] = ''
+    df.loc[missing < 0.05, 'lon'] = ''
+    df.loc[(missing >= 0.05) & (missing < 0.08), 'country'] = None
+    return df
+
+
+def check_equivalence(df, trials, seed=0):
+    rng = np.random.default_rng(seed)
+    for _ in range(trials):
+        frame, cols = random_frame(rng, int(rng.integers(1, 60)), int(rng.integers(1, 5)))
+        pd.testing.assert_frame_equal(explode_parallel_cols(frame, cols), reference_explode_parallel_cols(frame, cols))
+    empty = pd.DataFrame(columns=['doi', 'c0'])
+    pd.testing.assert_frame_equal(explode_parallel_cols(empty, ['c0']), reference_explode_parallel_cols(empty, ['c0']))
+    partners = df[df['is_nantes'] == False]
+    for columns, cols in APP_CALLS:
+        pd.testing.assert_frame_equal(explode_parallel_cols(partners[columns], cols),
+                                      reference_explode_parallel_cols(partners[columns], cols))
+    print(f"Équivalence vérifiée : {trials} tables aléatoires + table de coopérations")
+
+
+def replicate(df, factor):
+    if factor == 1:
+        return df
+    copies = [df.assign(doi=df['doi'].astype(str) + f"#{k}") for k in range(factor)]
+    return pd.concat(copies, ignore_index=True)
+
+
+def best_time(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vérifie et mesure explode_parallel_cols.")
+    parser.add_argument("--data", default=DATA_FILE, help="parquet de coopérations (table synthétique s'il est absent)")
+    parser.add_argument("--works", type=int, default=6000, help="publications de la table synthétique")
+    parser.add_argument("--factors", default="1,10,100", help="facteurs de réplication des données")
+    parser.add_argument("--trials", type=int, default=500, help="nombre de tables aléatoires comparées")
+    parser.add_argument("--reference-max-rows", type=int, default=300_000,
+                        help="ne pas chronométrer la référence au-delà de ce nombre de lignes")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if os.path.exists(args.data):
+        df = pd.read_parquet(args.data)
+        print(f"Données : {args.data}")
+    else:
+        df = synthetic_coop(args.works)
+        print(f"{args.data} introuvable : table synthétique ({args.works} publications, {len(df)} lignes)")
+    check_equivalence(df, args.trials)
+
+    columns, cols = APP_CALLS[1]
+    partners = df[df['is_nantes'] == False][columns]
+    print(f"{'Facteur':>8s} {'Lignes':>10s} {'Vectorisé':>10s} {'Référence':>10s} {'Gain':>7s}")
+    for factor in [int(f) for f in args.factors.split(",")]:
+        data = replicate(partners, factor)
+        new = best_time(lambda: explode_parallel_cols(data, cols), args.repeat)
+        if len(data) <= args.reference_max_rows:
+            ref = best_time(lambda: reference_explode_parallel_cols(data, cols), 1)
+            print(f"{factor:>7d}x {len(data):>10d} {new:>9.3f}s {ref:>9.3f}s {ref / new:>6.1f}x")
+        else:
+            print(f"{factor:>7d}x {len(data):>10d} {new:>9.3f}s {'-':>10s} {'-':>7s}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,349 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+# =============================================================================
+# Préparation des données de coopération, sans dépendance à Streamlit
+# (partagée par app.py et bench_collab.py).
+# =============================================================================
+
+# Chaînes stockées en Arrow avec la sémantique NaN habituelle (dtype `str` de pandas 3)
+try:
+    ARROW_STRING = pd.StringDtype("pyarrow", na_value=np.nan)  # pandas >= 2.3
+except TypeError:
+    ARROW_STRING = pd.StringDtype("pyarrow_numpy")  # pandas 2.1 / 2.2
+
+
+def read_dataset(path):
+    """
+    Lit un parquet en gardant les colonnes texte dans des tableaux Arrow
+    (pas un objet Python par cellule) : une seule copie compacte en mémoire,
+    partageable entre les sessions.
+    """
+    def types_mapper(arrow_type):
+        if pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type):
+            return ARROW_STRING
+        return None
+
+    return pq.read_table(path).to_pandas(types_mapper=types_mapper)
+
+
+def explode_parallel_cols(df, cols, id_col='doi'):
+    """
+    Explose des colonnes séparées par '|' en s'assurant qu'elles restent alignées.
+
+    Chaque ligne donne autant de lignes que sa colonne la plus longue ; les
+    colonnes plus courtes sont complétées par des chaînes vides. Le découpage
+    est fait colonne par colonne avec pyarrow, sans boucle sur les lignes.
+    """
+    if df.empty:
+        return pd.DataFrame(columns=[id_col] + cols)
+    split = {c: pc.split_pattern(pa.array(df[c].fillna('').astype(str), from_pandas=True), '|') for c in cols}
+    lengths = {c: pc.list_value_length(s).to_numpy().astype(np.int64) for c, s in split.items()}
+    # Nombre de lignes produites par ligne d'entrée, et position de sa première ligne
+    n = np.max(np.vstack(list(lengths.values())), axis=0)
+    starts = np.cumsum(n) - n
+
+    out = {id_col: np.repeat(df[id_col].to_numpy(), n)}
+    for c in cols:
+        values = pc.utf8_trim_whitespace(pc.list_flatten(split[c]))
+        length = lengths[c]
+        # Rang de chaque élément dans sa liste, puis position dans le résultat
+        rank = np.arange(len(values)) - np.repeat(np.cumsum(length) - length, length)
+        take = np.full(n.sum(), -1, dtype=np.int64)
+        take[np.repeat(starts, length) + rank] = np.arange(len(values))
+        col = pc.take(values, pa.array(take, mask=take < 0))
+        out[c] = pc.fill_null(col, '').to_pandas()
+    return pd.DataFrame(out)
+
+
+# =============================================================================
+# INDEX DES FACETTES
+# =============================================================================
+
+class FacetIndex:
+    """
+    Index inversé des filtres : pour chaque facette (pays, institution,
+    domaine...), valeur → tableau trié des codes des publications qui la
+    contiennent. Les filtres se combinent par intersection de masques sur les
+    publications, et le tableau n'est découpé qu'une fois à la fin.
+
+    La table longue (valeur, publication) de chaque facette est conservée
+    pour compter les options d'un filtre sur un masque sans redécouper la
+    colonne (counts).
+
+    Les valeurs sont comparées exactement, élément par élément : "IN" (Inde)
+    ne correspond plus à une ligne "CN|FI" comme avec str.contains.
+    """
+
+    def __init__(self, df, id_col='work_id'):
+        # df doit avoir un index positionnel (RangeIndex), comme en sortie de load_data()
+        self.row_work, self.works = pd.factorize(df[id_col], use_na_sentinel=False)
+        self.facets = {}
+        self.pairs = {}
+
+    def add(self, name, values, split=True):
+        """Indexe une colonne (ou une partie de ses lignes) ; split=True pour les listes séparées par '|'."""
+        rows = np.asarray(values.index, dtype=np.int64)
+        arr = pa.array(values.fillna('').astype(str), from_pandas=True)
+        if split:
+            lists = pc.split_pattern(arr, '|')
+            rows = np.repeat(rows, pc.list_value_length(lists).to_numpy().astype(np.int64))
+            arr = pc.list_flatten(lists)
+        long = pd.DataFrame({
+            'value': pc.utf8_trim_whitespace(arr).to_numpy(zero_copy_only=False),
+            'work': self.row_work[rows],
+        })
+        long = long[long['value'] != ''].drop_duplicates().sort_values(['value', 'work'])
+        keys, starts = np.unique(long['value'].to_numpy(dtype=object), return_index=True)
+        works = long['work'].to_numpy()
+        ends = np.append(starts[1:], len(works))
+        self.facets[name] = {k: works[s:e] for k, s, e in zip(keys, starts, ends)}
+        self.pairs[name] = (keys, np.repeat(np.arange(len(keys)), ends - starts), works)
+        return self
+
+    def mask(self, name, *values):
+        """Masque des publications contenant au moins une des valeurs de la facette."""
+        mask = np.zeros(len(self.works), dtype=bool)
+        for value in values:
+            mask[self.facets[name].get(value, [])] = True
+        return mask
+
+    def row_mask(self, frame_rows):
+        """Masque des publications ayant au moins une ligne vraie dans frame_rows (Series booléenne)."""
+        mask = np.zeros(len(self.works), dtype=bool)
+        mask[self.row_work[np.asarray(frame_rows.index[frame_rows.to_numpy(dtype=bool)], dtype=np.int64)]] = True
+        return mask
+
+    def counts(self, name, work_mask):
+        """Nombre de publications du masque par valeur de la facette (valeurs absentes exclues), par ordre alphabétique."""
+        keys, codes, works = self.pairs[name]
+        counts = np.bincount(codes[work_mask[works]], minlength=len(keys))
+        present = counts > 0
+        return pd.Series(counts[present], index=pd.Index(keys[present], name=name), name='count')
+
+    def select(self, frame, work_mask):
+        """Lignes de frame (sous-ensemble de df) appartenant aux publications du masque."""
+        return frame[work_mask[self.row_work[np.asarray(frame.index, dtype=np.int64)]]]
+
+
+def build_facet_index(df):
+    """Index des filtres de la barre latérale de app.py."""
+    index = FacetIndex(df)
+    for col in ['country', 'institution', 'domains', 'fields', 'subfields', 'topics']:
+        index.add(col, df[col])
+    # Couples (pays, institution) alignés, pour le sous-filtre établissement d'un pays
+    pairs = explode_parallel_cols(df[['institution', 'country']].assign(row=np.arange(len(df))),
+                                  ['institution', 'country'], id_col='row')
+    pairs = pairs[pairs['institution'] != '']
+    index.add('country_institution', pd.Series((pairs['country'] + '|' + pairs['institution']).to_numpy(),
+                                               index=pairs['row'].to_numpy()), split=False)
+    # Auteurs nantais par identifiant OpenAlex (les homonymes restent distincts)
+    index.add('author_id', df.loc[df['is_nantes'] == True, 'author_id'], split=False)
+    # Identifiants des structures nantaises (établissements, unités), sur les lignes des auteurs nantais
+    index.add('nantes_inst_id', df.loc[df['is_nantes'] == True, 'inst_id'])
+    return index
+
+
+# =============================================================================
+# STRUCTURES NANTAISES
+# =============================================================================
+
+def structure_bits(df, structures):
+    """
+    Masque de bits des structures nantaises (établissements, pôles, unités)
+    de chaque ligne d'auteur nantais, 0 pour les autres lignes.
+
+    structures = {nom: [identifiants OpenAlex]} ; le bit i correspond à la
+    i-ème structure (64 au plus). Les identifiants de inst_id sont comparés
+    exactement, sans expression régulière.
+    """
+    if len(structures) > 64:
+        raise ValueError(f"{len(structures)} structures : 64 au plus par masque")
+    id_bits = {}
+    for i, ids in enumerate(structures.values()):
+        for inst_id in ids:
+            id_bits[inst_id] = id_bits.get(inst_id, 0) | (1 << i)
+
+    nantes = df['is_nantes'].to_numpy(dtype=bool)
+    rows = np.flatnonzero(nantes)
+    lists = pc.split_pattern(pa.array(df['inst_id'].to_numpy()[rows].astype(object), from_pandas=True, type=pa.string()), '|')
+    rows = np.repeat(rows, pc.list_value_length(lists).fill_null(0).to_numpy().astype(np.int64))
+    ids = pd.Series(pc.utf8_trim_whitespace(pc.list_flatten(lists)).to_numpy(zero_copy_only=False))
+    bits = ids.map(id_bits).fillna(0).to_numpy(dtype=np.uint64)
+
+    out = np.zeros(len(df), dtype=np.uint64)
+    np.bitwise_or.at(out, rows, bits)
+    return out
+
+
+class AuthorIndex:
+    """
+    Auteurs nantais par identifiant OpenAlex : nom affiché (le plus fréquent),
+    masque de bits des structures où ils ont publié (structure_bits) et
+    libellé de la liste déroulante. Les homonymes sont distingués par leur
+    identifiant dans le libellé. Leurs publications sont dans la facette
+    'author_id' de FacetIndex.
+    """
+
+    def __init__(self, df, bits):
+        nantes = df[df['is_nantes'] == True]
+        codes, ids = pd.factorize(nantes['author_id'])
+        author_bits = np.zeros(len(ids), dtype=np.uint64)
+        np.bitwise_or.at(author_bits, codes, bits[np.asarray(nantes.index, dtype=np.int64)])
+
+        names = (nantes.groupby(['author_id', 'author'], sort=False).size()
+                 .sort_values(ascending=False, kind='stable').reset_index()
+                 .drop_duplicates('author_id').set_index('author_id')['author'])
+        table = pd.DataFrame({'name': names.reindex(ids).to_numpy(), 'bits': author_bits},
+                             index=pd.Index(np.asarray(ids, dtype=object), name='author_id'))
+        homonym = table['name'].duplicated(keep=False)
+        table['label'] = table['name'].where(~homonym, table['name'] + " (" + table.index.to_series() + ")")
+        self.table = table.sort_values(['name', 'label'], kind='stable')
+        self.labels = self.table['label'].to_dict()
+        self.first_id = self.table.reset_index().drop_duplicates('name').set_index('name')['author_id'].to_dict()
+
+    def options(self, mask=None):
+        """Identifiants des auteurs (d'au moins une des structures du masque), par ordre alphabétique."""
+        if mask is None:
+            return list(self.table.index)
+        return list(self.table.index[(self.table['bits'].to_numpy() & mask) != 0])
+
+    def label(self, author_id):
+        return self.labels.get(author_id, author_id)
+
+    def resolve(self, value):
+        """Identifiant d'un auteur donné par identifiant ou par nom (anciennes URL)."""
+        if value in self.labels:
+            return value
+        return self.first_id.get(value, value)
+
+
+# =============================================================================
+# TABLE DES PARTENAIRES
+# =============================================================================
+
+class PartnerTable:
+    """
+    Institutions partenaires étrangères (hors auteurs nantais et hors France),
+    une ligne par (institution, pays, coordonnées, publication), avec l'année
+    de la publication. Calculée une fois par version du jeu de données : les
+    filtres ne font qu'intersecter leur masque de publications avec elle.
+
+    Pour la carte, chaque emplacement (institution, pays, coordonnées) a sa
+    position d'affichage précalculée (badges superposés décalés en cercle) et
+    son groupe dans une grille de grid_sizes degrés, un niveau par taille.
+    """
+
+    def __init__(self, df, facets, grid_sizes=()):
+        rows = df[df['is_nantes'] == False]
+        long = explode_parallel_cols(
+            rows[['institution', 'country', 'lat', 'lon']].assign(row=np.asarray(rows.index, dtype=np.int64)),
+            ['institution', 'country', 'lat', 'lon'], id_col='row'
+        )
+        long = long[(long['institution'] != '') & ~long['country'].isin(['FR', 'nan', ''])]
+        row = long['row'].to_numpy(dtype=np.int64)
+        table = pd.DataFrame({
+            'work': facets.row_work[row],
+            'institution': long['institution'].to_numpy(),
+            'country': long['country'].to_numpy(),
+            'lat': pd.to_numeric(long['lat'], errors='coerce').to_numpy(),
+            'lon': pd.to_numeric(long['lon'], errors='coerce').to_numpy(),
+            'year': df['year'].to_numpy()[row],
+        }).drop_duplicates(subset=['work', 'institution', 'country', 'lat', 'lon'])
+        table['inst'], self.institutions = pd.factorize(table['institution'])
+        self.works = facets.works
+        # Couples (institution, publication) distincts, tous pays confondus
+        self._inst_works = table[['inst', 'work']].drop_duplicates()
+
+        # Emplacements : code 'loc' de chaque ligne (-1 sans coordonnées)
+        keys = ['institution', 'country', 'lat', 'lon']
+        locations = table[keys].dropna().drop_duplicates().reset_index(drop=True)
+        table = table.merge(locations.rename_axis('loc').reset_index(), on=keys, how='left', sort=False)
+        table['loc'] = table['loc'].fillna(-1).astype(np.int64)
+        self.table = table
+
+        # Décalage des badges au même endroit : 8 par cercle, cercles de plus en plus grands
+        rank = locations.groupby(['lat', 'lon']).cumcount().to_numpy()
+        angle = rank * (2 * np.pi / 8)
+        radius = np.where(rank > 0, 0.008 * (1 + rank // 8), 0.0)
+        locations['map_lat'] = locations['lat'] + np.sin(angle) * radius
+        locations['map_lon'] = locations['lon'] + np.cos(angle) * radius
+        self.locations = locations
+
+        # Cellule de chaque emplacement dans chaque grille
+        self.cells = {}
+        for size in grid_sizes:
+            cell, _ = pd.factorize(pd.MultiIndex.from_arrays([
+                np.floor(locations['lat'] / size), np.floor(locations['lon'] / size)
+            ]))
+            self.cells[size] = cell
+
+    def _pairs(self, country=None):
+        if country is None:
+            return self._inst_works
+        return self.table.loc[self.table['country'] == country, ['inst', 'work']].drop_duplicates()
+
+    def institution_counts(self, work_mask, country=None):
+        """Nombre de publications du masque par institution (d'un pays donné), par ordre décroissant."""
+        pairs = self._pairs(country)
+        inst = pairs['inst'].to_numpy()[work_mask[pairs['work'].to_numpy()]]
+        counts = np.bincount(inst, minlength=len(self.institutions))
+        present = np.flatnonzero(counts)
+        stats = pd.DataFrame({'Institution': self.institutions[present], 'Publications': counts[present]})
+        return stats.sort_values('Publications', ascending=False, kind='stable').reset_index(drop=True)
+
+    def institution_works(self, institutions, work_mask, country=None):
+        """work_id des publications du masque de chaque institution demandée."""
+        pairs = self._pairs(country)
+        pairs = pairs[pairs['inst'].isin(self.institutions.get_indexer(institutions))
+                      & work_mask[pairs['work'].to_numpy()]]
+        work_ids = pd.Series(np.asarray(self.works, dtype=object)[pairs['work'].to_numpy()], index=pairs.index)
+        return work_ids.groupby(self.institutions[pairs['inst'].to_numpy()]).agg(list)
+
+    def _located(self, work_mask, country=None, bounds=None):
+        """Lignes (emplacement, publication) du masque, d'un pays et d'une zone (lat_min, lat_max, lon_min, lon_max)."""
+        loc = self.table['loc'].to_numpy()
+        keep = (loc >= 0) & work_mask[self.table['work'].to_numpy()]
+        if country is not None:
+            keep &= self.table['country'].to_numpy() == country
+        if bounds is not None:
+            lat_min, lat_max, lon_min, lon_max = bounds
+            lat, lon = self.table['lat'].to_numpy(), self.table['lon'].to_numpy()
+            keep &= (lat >= lat_min) & (lat <= lat_max) & (lon >= lon_min) & (lon <= lon_max)
+        return loc[keep], self.table['work'].to_numpy()[keep]
+
+    def location_counts(self, work_mask, country=None, bounds=None):
+        """Emplacements ayant des publications dans le masque, avec leur nombre ('count')."""
+        loc, _ = self._located(work_mask, country, bounds)
+        # (emplacement, publication) est unique dans la table
+        counts = np.bincount(loc, minlength=len(self.locations))
+        present = np.flatnonzero(counts)
+        return self.locations.iloc[present].assign(loc=present, count=counts[present])
+
+    def cluster_counts(self, size, work_mask, country=None, bounds=None):
+        """
+        Regroupement des emplacements dans la grille de size degrés : position
+        moyenne, emprise des emplacements, nombre d'institutions et de
+        publications distinctes ('count') de chaque cellule non vide.
+        """
+        loc, work = self._located(work_mask, country, bounds)
+        cell = self.cells[size]
+        pairs = np.unique(np.stack([cell[loc], work], axis=1), axis=0) if len(loc) else np.empty((0, 2), dtype=np.int64)
+        counts = pd.Series(np.bincount(pairs[:, 0], minlength=cell.max() + 1) if len(pairs) else [], dtype=np.int64)
+        members = self.locations.iloc[np.unique(loc)].assign(cell=cell[np.unique(loc)])
+        clusters = members.groupby('cell').agg(
+            lat=('lat', 'mean'), lon=('lon', 'mean'),
+            lat_min=('lat', 'min'), lat_max=('lat', 'max'),
+            lon_min=('lon', 'min'), lon_max=('lon', 'max'),
+            institutions=('institution', 'nunique'),
+        )
+        clusters['count'] = counts.reindex(clusters.index).to_numpy()
+        return clusters.reset_index()
+
+    def location_works(self, loc, work_mask):
+        """work_id des publications du masque à un emplacement."""
+        rows = self.table[(self.table['loc'] == loc) & work_mask[self.table['work'].to_numpy()]]
+        return list(np.asarray(self.works, dtype=object)[rows['work'].to_numpy()])
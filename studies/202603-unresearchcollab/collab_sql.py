@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+
+from sql_engine import split_values
+
+# =============================================================================
+# Filtres de app.py sur le moteur SQL optionnel (studies/sql_engine.py)
+#
+# Avec DATAVIZ_ENGINE=duckdb, les filtres de la barre latérale et le comptage
+# de leurs options interrogent la vue 'coop' (cooperations_nantesu.parquet)
+# au lieu des masques de l'index des facettes. Mêmes règles que FacetIndex :
+# une publication (work_id) est retenue si au moins une de ses lignes
+# contient la valeur, comparée exactement élément par élément.
+# =============================================================================
+
+TABLE = 'coop'
+
+# Facette → (colonne, liste séparée par '|', lignes des auteurs nantais uniquement)
+FACETS = {
+    'country': ("country", True, False),
+    'institution': ("institution", True, False),
+    'domains': ("domains", True, False),
+    'fields': ("fields", True, False),
+    'subfields': ("subfields", True, False),
+    'topics': ("topics", True, False),
+    'author_id': ("coalesce(nullif(author_id, ''), author, 'Inconnu')", False, True),
+    'nantes_inst_id': ("inst_id", True, True),
+}
+
+
+def _facet(engine, name):
+    column, split, nantes_only = FACETS[name]
+    if name == 'author_id' and 'author_id' not in engine.columns[TABLE]:
+        # Extractions antérieures sans identifiant OpenAlex : l'auteur est repéré par son nom (comme load_data)
+        column = "coalesce(author, 'Inconnu')"
+    return (split_values(column) if split else f"[{column}]"), nantes_only
+
+
+def _having(engine, years, author, limit, filters):
+    """Conditions (par publication) et paramètres de l'état des filtres."""
+    conds = ["bool_or(year BETWEEN ? AND ?)"]
+    params = [int(years[0]), int(years[1])]
+    if author != "Tous les auteurs":
+        filters = (('author_id', (author,)),) + tuple(filters)
+    if limit is not None:
+        conds.append("bool_or(authors_count <= ?)")
+        params.append(int(limit))
+    for name, values in filters:
+        expr, nantes_only = _facet(engine, name)
+        cond = f"list_has_any({expr}, ?::VARCHAR[])"
+        if nantes_only:
+            cond = f"(is_nantes AND {cond})"
+        conds.append(f"bool_or({cond})")
+        params.append(tuple(values))
+    return " AND ".join(conds), tuple(params)
+
+
+def works(engine, years, author, limit=None, filters=()):
+    """work_id des publications retenues par les filtres ((facette, valeurs), ...)."""
+    having, params = _having(engine, years, author, limit, filters)
+    return engine.query(f"SELECT work_id FROM {TABLE} GROUP BY work_id HAVING {having}", params)['work_id']
+
+
+def work_mask(engine, all_works, years, author, limit=None, filters=()):
+    """Masque des publications retenues, aligné sur all_works (FacetIndex.works)."""
+    mask = np.zeros(len(all_works), dtype=bool)
+    positions = pd.Index(all_works).get_indexer(works(engine, years, author, limit, filters))
+    mask[positions[positions >= 0]] = True
+    return mask
+
+
+def facet_counts(engine, name, years, author, filters=()):
+    """Nombre de publications retenues par valeur de la facette (équivalent de FacetIndex.counts)."""
+    having, params = _having(engine, years, author, None, filters)
+    if name == 'country_institution':
+        # Colonnes parallèles : unnest de deux listes dans le même SELECT = alignement par position
+        values = ("SELECT work_id, trim(unnest(string_split(coalesce(country, ''), '|'))) AS c, "
+                  "trim(unnest(string_split(coalesce(institution, ''), '|'))) AS i "
+                  f"FROM {TABLE}")
+        values = f"SELECT work_id, coalesce(c, '') || '|' || i AS value FROM ({values}) WHERE i <> ''"
+    else:
+        expr, nantes_only = _facet(engine, name)
+        where = "WHERE is_nantes" if nantes_only else ""
+        values = f"SELECT work_id, unnest({expr}) AS value FROM {TABLE} {where}"
+    sql = (f"SELECT value, count(DISTINCT work_id) AS count FROM ({values}) "
+           f"WHERE value IS NOT NULL AND value <> '' "
+           f"AND work_id IN (SELECT work_id FROM {TABLE} GROUP BY work_id HAVING {having}) "
+           f"GROUP BY value ORDER BY value")
+    result = engine.query(sql, params)
+    return pd.Series(result['count'].to_numpy(), index=pd.Index(result['value'].to_numpy(), name=name), name='count')
@@ -0,0 +1,54 @@
+import argparse
+import json
+import os
+
+# =============================================================================
+# Table code pays ISO 3166 (alpha-2) → nom français, générée une fois et
+# livrée avec l'application (country_names_fr.json) : le tableau de bord n'a
+# plus à importer Babel ni pycountry.
+#
+#   uv run --with babel --with pycountry python country_names.py
+# =============================================================================
+
+OUTPUT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "country_names_fr.json")
+
+# Codes utilisés par OpenAlex hors ISO 3166
+ALIASES = {"UK": "GB"}
+
+
+def build_country_names():
+    """Nom français (Babel) de chaque code, ou nom anglais (pycountry) à défaut."""
+    import pycountry
+    from babel import Locale
+
+    territories = Locale('fr').territories
+    codes = {c.alpha_2 for c in pycountry.countries}
+    codes |= {code for code in territories if len(code) == 2 and code.isalpha()}
+
+    names = {}
+    for code in sorted(codes | set(ALIASES)):
+        iso = ALIASES.get(code, code)
+        name = territories.get(iso)
+        if not name:
+            country = pycountry.countries.get(alpha_2=iso)
+            name = country.name if country else None
+        if name:
+            names[code] = name
+    return names
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Génère la table code pays → nom français.")
+    parser.add_argument("outputs", nargs="*", default=[OUTPUT_FILE], help="fichiers JSON à écrire")
+    args = parser.parse_args()
+
+    names = build_country_names()
+    for path in args.outputs:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(names, f, ensure_ascii=False, indent=1, sort_keys=True)
+            f.write("\n")
+        print(f"{len(names)} pays → {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -101,6 +101,7 @@ def get_cooperations():
             # Analyser les auteurs et affiliations
             for auth in work.get('authorships', []):
                 author_name = auth['author']['display_name']
+                author_id = (auth['author'].get('id') or "").replace("https://openalex.org/", "")
                 
                 institutions = []
                 inst_ids = []
@@ -141,6 +142,7 @@ def get_cooperations():
                         "title": title,
                         "year": year,
                         "author": author_name,
+                        "author_id": author_id,
                         "institution": "|".join(dict.fromkeys(filter(None, institutions))),
                         "inst_id": "|".join(dict.fromkeys(filter(None, inst_ids))),
                         "ror": "|".join(dict.fromkeys(filter(None, rors))),
@@ -1,12 +1,30 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.express as px
 import os
 import requests
 import re
-import unicodedata
+import json
+import sys
+import threading
+import time
 from pathlib import Path
 
+# Rerun instrumentation, shared by the studies (studies/perf.py)
+STUDIES_DIR = str(Path(__file__).resolve().parents[1])
+if STUDIES_DIR not in sys.path:
+    sys.path.insert(0, STUDIES_DIR)
+import perf
+import sql_engine
+from axes_data import GRIST_AXIS_COLS, apply_grist, build_facts, prepare, update_axes
+from search_index import SearchIndex, normalize_text
+
+# Copy-on-Write (default from pandas 3): a shallow copy of the shared dataset
+# only copies the columns that are then modified (see AxesDataset)
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+
 # --- PERMANENT RESEARCHERS LIST ---
 # Format: (LASTNAME, FIRSTNAME) — last name may be compound (e.g., "DA CUNHA")
 PERMANENT_RESEARCHERS = [
@@ -55,37 +73,35 @@ PERMANENT_RESEARCHERS = [
     ("WEBER", "Matthieu"), ("METILLON", "Marceau"),
 ]
 
-_SPECIAL_CHARS = str.maketrans({
-    'ł': 'l', 'ø': 'o', 'ð': 'd', 'þ': 't', 'æ': 'ae', 'œ': 'oe',
-    'ß': 'ss', 'ĸ': 'k', 'ŋ': 'n', 'ı': 'i',
-})
-
 def _norm(text):
-    """Normalize text: lowercase, transliterate special Latin chars, remove accents."""
-    if not isinstance(text, str):
-        return ""
-    text = text.lower()
-    text = text.translate(_SPECIAL_CHARS)
-    text = "".join(c for c in unicodedata.normalize('NFD', text) if unicodedata.category(c) != 'Mn')
-    text = re.sub(r'[^a-z]', '', text)
-    return text
+    """Normalize text: lowercase, transliterate special Latin chars, remove accents, keep letters only."""
+    return re.sub(r'[^a-z]', '', normalize_text(text))
 
 def _build_researcher_lookup():
-    """Build {norm_last_word: [(norm_full_last, norm_first_initial, orig_last, orig_first)]}."""
+    """Build {norm_last_word: [(norm_full_last, norm_first_initial, researcher_id)]}."""
     lookup = {}
-    for last, first in PERMANENT_RESEARCHERS:
+    for researcher_id, (last, first) in enumerate(PERMANENT_RESEARCHERS):
         norm_full_last = _norm(last)
         norm_first_init = _norm(first[0]) if first else ""
         for word in last.split():
             key = _norm(word)
             if len(key) >= 3:
-                lookup.setdefault(key, []).append((norm_full_last, norm_first_init, last, first))
+                lookup.setdefault(key, []).append((norm_full_last, norm_first_init, researcher_id))
     return lookup
 
 _RESEARCHER_LOOKUP = _build_researcher_lookup()
 
+def _canonical_name(last, first):
+    """Display name like 'Jose Vicente Aguado Lopez'."""
+    first_str = first.title() if first else ""
+    last_str = last.title()
+    return f"{first_str} {last_str}".strip() if first_str else last_str
+
+# Canonical display names, indexed by researcher id (position in PERMANENT_RESEARCHERS)
+RESEARCHER_NAMES = [_canonical_name(last, first) for last, first in PERMANENT_RESEARCHERS]
+
 def _match_researcher(author_name):
-    """Return (orig_last, orig_first) from PERMANENT_RESEARCHERS if matched, else None."""
+    """Return the researcher id (index in PERMANENT_RESEARCHERS) if matched, else None."""
     if not isinstance(author_name, str) or not author_name.strip():
         return None
     words = author_name.strip().split()
@@ -97,29 +113,38 @@ def _match_researcher(author_name):
         if len(key) < 3:
             continue
         if key in _RESEARCHER_LOOKUP:
-            for norm_full_last, r_first_init, orig_last, orig_first in _RESEARCHER_LOOKUP[key]:
+            for norm_full_last, r_first_init, researcher_id in _RESEARCHER_LOOKUP[key]:
                 if not r_first_init or norm_first_init == r_first_init:
-                    return (orig_last, orig_first)
+                    return researcher_id
     return None
 
-def get_canonical_name(author_name):
-    """Return a display name like 'Jose Vicente Aguado Lopez' from the official list, or None."""
-    match = _match_researcher(author_name)
-    if match is None:
-        return None
-    orig_last, orig_first = match
-    first_str = orig_first.title() if orig_first else ""
-    last_str = orig_last.title()
-    return f"{first_str} {last_str}".strip() if first_str else last_str
-
-def is_permanent_researcher(author_name):
-    return _match_researcher(author_name) is not None
-
-def has_permanent_researcher(authors_str):
-    """Return True if any author in a pipe-separated string is a permanent researcher."""
-    if not isinstance(authors_str, str):
-        return False
-    return any(is_permanent_researcher(a.strip()) for a in authors_str.split('|'))
+def resolve_researchers(authors):
+    """
+    Map a Series of pipe-separated author strings to the permanent researchers
+    they contain.  Each distinct author name is matched only once.
+
+    Returns a Series of researcher ids, one row per (publication, researcher),
+    indexed like `authors`.
+    """
+    authors_long = authors.fillna("").str.split('|').explode().str.strip()
+    id_by_name = {name: _match_researcher(name) for name in authors_long.unique()}
+    ids_long = authors_long.map(id_by_name).dropna().astype(int)
+    return ids_long[~pd.MultiIndex.from_arrays([ids_long.index, ids_long.to_numpy()]).duplicated()]
+
+def build_author_options(df):
+    """
+    Sidebar author choices, built once per load (Grist corrections do not
+    change the authors): canonical names of the permanent researchers found
+    in the data with their row labels, and every author name.
+    """
+    ids_long = df['researcher_ids'].explode().dropna().astype(int)
+    names = pd.Series(np.asarray(RESEARCHER_NAMES, dtype=object)[ids_long.to_numpy()], index=ids_long.index)
+    authors = df['authors'].dropna().str.split('|').explode().str.strip()
+    return {
+        'permanent': sorted(names.unique()),
+        'all': sorted(set(authors[authors != ""])),
+        'rows': names.index.groupby(names),
+    }
 
 # Define a distinct and high-contrast color palette for the 4 strategic axes
 AXIS_COLOR_MAP = {
@@ -130,7 +155,6 @@ AXIS_COLOR_MAP = {
     "Autre / Non classé": "#A9A9A9"                              # Dark Gray
 }
 AXIS_NAMES = [ax for ax in AXIS_COLOR_MAP if ax != "Autre / Non classé"]
-SCORE_THRESHOLD = 1.0  # axes with score strictly above this are included
 
 # --- GRIST CONFIGURATION ---
 GRIST_DOC_ID = "5aREUrB1kuFAcVY4GTUDfA"
@@ -142,166 +166,405 @@ try:
 except Exception:
     GRIST_API_KEY = None
 
-@st.cache_data(ttl=300) # Cache for 5 minutes
-def load_grist_data():
-    if not GRIST_API_KEY:
-        return pd.DataFrame(), "Clé API absente"
-    
-    headers = {"Authorization": f"Bearer {GRIST_API_KEY}"}
-    try:
-        response = requests.get(GRIST_BASE_URL, headers=headers)
-        if response.status_code == 200:
-            records = response.json().get('records', [])
-            if not records:
-                return pd.DataFrame(), "Table Grist vide"
-            # Extract fields from Grist records
-            data = []
-            for r in records:
-                row = r['fields']
-                row['grist_id'] = r['id']
-                data.append(row)
-            return pd.DataFrame(data), "OK"
-        else:
-            return pd.DataFrame(), f"Erreur {response.status_code}: {response.text}"
-    except Exception as e:
-        return pd.DataFrame(), f"Exception: {str(e)}"
-
-def update_grist_axis(grist_id, new_axis):
-    """Update the axis in Grist for a specific record."""
-    if not GRIST_API_KEY:
-        return False, "Clé API Grist manquante."
-    if not grist_id or (isinstance(grist_id, float) and pd.isna(grist_id)):
-        return False, "ID Grist manquant (la publication n'a pas été trouvée dans Grist)."
-    
-    headers = {"Authorization": f"Bearer {GRIST_API_KEY}"}
-    # Grist API usually requires the field ID. 
-    # Important: if you have 'Axe Retenu' in your CSV, it might be 'Axe_Retenu' OR 'Axe_Retenu_2'
-    # We try 'Axe_Retenu' as it's the most common.
-    payload = {
-        "records": [
-            {
-                "id": grist_id,
-                "fields": {"Axe_Retenu": new_axis}
-            }
-        ]
-    }
-    try:
-        response = requests.patch(GRIST_BASE_URL, headers=headers, json=payload)
-        if response.status_code == 200:
-            return True, "Success"
-        else:
-            return False, f"Erreur API Grist ({response.status_code}): {response.text}"
-    except Exception as e:
-        return False, f"Exception lors de la mise à jour : {str(e)}"
+GRIST_DOC_URL = f"https://grist.numerique.gouv.fr/api/docs/{GRIST_DOC_ID}"
+GRIST_MIRROR_FILE = Path(__file__).parent / ".grist_mirror.json"
+GRIST_SYNC_INTERVAL = 300  # seconds between two syncs with Grist
+# Seconds between two comparisons of the whole table with the mirror: the
+# incremental sync (UpdatedAt > last sync) does not see deleted records.
+GRIST_FULL_SYNC_INTERVAL = 3600
+# Column with the last modification time of a record (Grist trigger formula
+# column, e.g. NOW() on change).  Without one, each sync pulls the whole table
+# but only the records that actually changed are applied to the dataset.
+GRIST_UPDATED_AT_COLS = ['updatedat', 'updated_at', 'modifie_le', 'derniere_modification']
+GRIST_FLUSH_DELAY = 3  # seconds: corrections made within this window go out in one PATCH
+GRIST_FLUSH_MAX_DELAY = 300  # seconds: cap of the retry delay, doubled after each failed PATCH
+
+class GristMirror:
+    """
+    Local copy of the Grist corrections table ({grist_id: fields}), persisted
+    in GRIST_MIRROR_FILE and synced incrementally: only the records modified
+    since the last sync are fetched, unless the table schema changed or the
+    last full comparison is older than GRIST_FULL_SYNC_INTERVAL.  `lock`
+    serialises the syncs and the writes of CorrectionQueue.flush.
+    """
+
+    def __init__(self, path=GRIST_MIRROR_FILE):
+        self.path = Path(path)
+        self.session = requests.Session()
+        if GRIST_API_KEY:
+            self.session.headers["Authorization"] = f"Bearer {GRIST_API_KEY}"
+        self.schema = []
+        self.records = {}
+        self.updated_col = None
+        self.last_seen = None
+        self.last_sync = 0.0
+        self.last_full = 0.0  # wall-clock time, persisted with the mirror
+        self.lock = threading.Lock()
+        self.status = "OK" if GRIST_API_KEY else "Clé API absente"
+        self._load()
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                saved = json.load(f)
+            self.schema = saved["schema"]
+            self.records = {int(k): v for k, v in saved["records"].items()}
+            self.updated_col = saved.get("updated_col")
+            self.last_seen = saved.get("last_seen")
+            self.last_full = saved.get("last_full", 0.0)
+        except Exception:
+            self.schema, self.records = [], {}
+
+    def _save(self):
+        try:
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump({
+                    "schema": self.schema, "records": self.records,
+                    "updated_col": self.updated_col, "last_seen": self.last_seen,
+                    "last_full": self.last_full,
+                }, f, ensure_ascii=False)
+        except OSError:
+            pass  # read-only filesystem: the mirror just stays in memory
+
+    def _max_updated(self):
+        values = [r.get(self.updated_col) for r in self.records.values()] if self.updated_col else []
+        values = [v for v in values if v is not None]
+        return max(values) if values else None
+
+    @property
+    def axis_col(self):
+        return next((c for c in self.schema if c.lower() in GRIST_AXIS_COLS), None)
+
+    def to_frame(self, ids=None):
+        """Records as a DataFrame (fields + grist_id), like the Grist /records endpoint."""
+        ids = self.records.keys() if ids is None else ids
+        return pd.DataFrame([{**self.records[i], 'grist_id': i} for i in ids if i in self.records])
+
+    def _fetch_schema(self):
+        response = self.session.get(f"{GRIST_DOC_URL}/tables/{GRIST_TABLE_NAME}/columns", timeout=30)
+        response.raise_for_status()
+        return [c['id'] for c in response.json().get('columns', [])]
+
+    def _fetch_all(self):
+        response = self.session.get(GRIST_BASE_URL, timeout=60)
+        response.raise_for_status()
+        return {r['id']: r['fields'] for r in response.json().get('records', [])}
+
+    def _fetch_modified_since(self, since):
+        payload = {
+            "sql": f'SELECT * FROM "{GRIST_TABLE_NAME}" WHERE "{self.updated_col}" > ?',
+            "args": [since],
+        }
+        response = self.session.post(f"{GRIST_DOC_URL}/sql", json=payload, timeout=30)
+        response.raise_for_status()
+        rows = [r['fields'] for r in response.json().get('records', [])]
+        return {r.pop('id'): r for r in rows}
+
+    def sync(self, force=False):
+        """
+        Bring the mirror up to date.  Returns (changed, full): `changed` is a
+        DataFrame of the records that changed (deleted records keep their
+        last known fields with an empty axis), `full` is True when the whole
+        table was reloaded because the schema changed.  Returns (None, False)
+        when the sync interval has not elapsed, or when another sync or flush
+        is in progress (unless force: then it waits for it).
+        """
+        if not GRIST_API_KEY:
+            return None, False
+        if not force and time.monotonic() - self.last_sync < GRIST_SYNC_INTERVAL:
+            return None, False
+        if not self.lock.acquire(blocking=force):
+            return None, False
+        try:
+            return self._sync()
+        finally:
+            self.lock.release()
+
+    def _sync(self):
+        self.last_sync = time.monotonic()
+        try:
+            schema = self._fetch_schema()
+            if schema != self.schema or not self.records:
+                self.records = self._fetch_all()
+                self.schema = schema
+                self.updated_col = next((c for c in schema if c.lower() in GRIST_UPDATED_AT_COLS), None)
+                self.last_seen = self._max_updated()
+                self.last_full = time.time()
+                changed, full = self.to_frame(), True
+            elif (self.updated_col and self.last_seen is not None
+                  and time.time() - self.last_full < GRIST_FULL_SYNC_INTERVAL):
+                fresh = self._fetch_modified_since(self.last_seen)
+                self.records.update(fresh)
+                self.last_seen = self._max_updated()
+                changed, full = self.to_frame(fresh.keys()), False
+            else:
+                # Whole table compared with the mirror: also finds the deleted records
+                fresh = self._fetch_all()
+                changed_ids = [i for i, fields in fresh.items() if self.records.get(i) != fields]
+                deleted = self.to_frame([i for i in self.records if i not in fresh])
+                self.records = fresh
+                self.last_seen = self._max_updated()
+                self.last_full = time.time()
+                changed, full = self.to_frame(changed_ids), False
+                if not deleted.empty:
+                    axis_cols = [c for c in deleted.columns if c.lower() in GRIST_AXIS_COLS]
+                    deleted[axis_cols] = None
+                    changed = pd.concat([changed, deleted], ignore_index=True)
+            self.status = "OK" if self.records else "Table Grist vide"
+            self._save()
+            return changed, full
+        except Exception as e:
+            self.status = f"Exception: {str(e)}"
+            return None, False
+
+class CorrectionQueue:
+    """
+    Axis corrections waiting to be written to Grist, {grist_id: (work_id, axes)}.
+    Successive edits of the same record are coalesced (last one wins) and the
+    whole queue is sent in a single PATCH, on demand or GRIST_FLUSH_DELAY
+    seconds after the first queued edit.  After a failed PATCH the flush is
+    retried, with a delay doubled at each consecutive failure.
+    """
+
+    def __init__(self, mirror):
+        self.mirror = mirror
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.last_error = None
+        self._timer = None
+        self._failures = 0
+
+    def _arm(self, delay):
+        """Schedule a flush in `delay` seconds, unless one is scheduled (caller holds the lock)."""
+        if self._timer is None and self.pending:
+            self._timer = threading.Timer(delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _retry(self, error):
+        """Record a failed flush and schedule the next attempt. Returns (False, error)."""
+        with self.lock:
+            self.last_error = error
+            self._failures += 1
+            self._arm(min(GRIST_FLUSH_DELAY * 2 ** self._failures, GRIST_FLUSH_MAX_DELAY))
+        return False, error
+
+    def put(self, grist_id, work_id, axes):
+        with self.lock:
+            self.pending[int(grist_id)] = (work_id, axes)
+            self._arm(GRIST_FLUSH_DELAY)
+
+    def flush(self):
+        """Send all pending corrections in one PATCH. Returns (success, message)."""
+        with self.lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            batch = dict(self.pending)
+        if not batch:
+            return True, "Aucune correction en attente."
+
+        # Grist API usually requires the field ID.
+        # Important: if you have 'Axe Retenu' in your CSV, it might be 'Axe_Retenu' OR 'Axe_Retenu_2'
+        # We use the column found in the table schema, else 'Axe_Retenu' as it's the most common.
+        axis_col = self.mirror.axis_col or "Axe_Retenu"
+        payload = {
+            "records": [
+                {"id": grist_id, "fields": {axis_col: axes}}
+                for grist_id, (_, axes) in batch.items()
+            ]
+        }
+        # No sync between the PATCH and the mirror update: it could fetch the
+        # records before the PATCH and overwrite the corrections just sent
+        with self.mirror.lock:
+            try:
+                response = self.mirror.session.patch(GRIST_BASE_URL, json=payload, timeout=30)
+                if response.status_code != 200:
+                    return self._retry(f"Erreur API Grist ({response.status_code}): {response.text}")
+            except Exception as e:
+                return self._retry(f"Exception lors de la mise à jour : {str(e)}")
+
+            with self.lock:
+                for grist_id, entry in batch.items():
+                    # Keep edits queued while the request was in flight
+                    if self.pending.get(grist_id) == entry:
+                        del self.pending[grist_id]
+                    # Grist now holds the value: the next sync must not see it as a change
+                    if grist_id in self.mirror.records:
+                        self.mirror.records[grist_id][axis_col] = entry[1]
+                self.last_error = None
+                self._failures = 0
+        return True, f"{len(batch)} correction(s) envoyée(s) à Grist."
+
+    def as_frame(self):
+        """Pending corrections as Grist-like records, to overlay on the dataset."""
+        with self.lock:
+            rows = [{'work_id': w, 'Axe_Retenu': axes, 'grist_id': g} for g, (w, axes) in self.pending.items()]
+        return pd.DataFrame(rows, columns=['work_id', 'Axe_Retenu', 'grist_id'])
 
 st.set_page_config(page_title="Dashboard Axes Stratégiques Centrale Nantes", layout="wide")
-
-def normalize_title(text):
-    """Normalize title for matching: lowercase, no accents, no special chars."""
-    if not isinstance(text, str):
-        return ""
-    # Lowercase
-    text = text.lower()
-    # Remove accents
-    text = "".join(c for c in unicodedata.normalize('NFD', text) if unicodedata.category(c) != 'Mn')
-    # Keep only alphanumeric chars
-    text = re.sub(r'[^a-zA-Z0-9]', '', text)
-    return text
-
-@st.cache_data
-def load_data():
-    file_path = Path(__file__).parent / "centrale_axes_data.parquet"
+# Per-rerun timings (DATAVIZ_PERF=1 or ?perf=1), see perf.py
+perf.start(__file__)
+
+# Data directory: the script's, unless DATAVIZ_DATA_DIR is set (bench_apps.py fixtures)
+DATA_DIR = Path(os.environ.get("DATAVIZ_DATA_DIR", Path(__file__).parent))
+DATA_FILE = DATA_DIR / "centrale_axes_data.parquet"
+# Heavy text columns (abstract, motivation, topics, subfields) live in a
+# separate table keyed by work_id, only read for the publications displayed.
+TEXT_FILE = DATA_DIR / "centrale_axes_text.parquet"
+TEXT_COLUMNS = ["abstract", "motivation", "topics", "subfields"]
+
+@perf.cache_data(max_entries=256)
+def load_texts(work_ids):
+    """Return {work_id: {abstract, motivation, topics, subfields}} for the given works."""
+    if not work_ids or not os.path.exists(TEXT_FILE):
+        return {}
+    texts = pd.read_parquet(TEXT_FILE, filters=[("work_id", "in", list(work_ids))])
+    return texts.set_index("work_id")[TEXT_COLUMNS].to_dict("index")
+
+def load_data(grist_df=None):
+    """Load the analytics table and merge the Grist corrections into it."""
+    file_path = DATA_FILE
     if not os.path.exists(file_path):
         st.error(f"Fichier de données {file_path} non trouvé. Exécutez d'abord `process_axes.py`.")
         return pd.DataFrame()
-    df = pd.read_parquet(file_path)
-    
-    # Store the initial IA prediction
-    df['prediction_ia'] = df['chosen_axis']
-    df['is_corrected'] = False
-    
-    # Merge with Grist corrections if available
-    grist_df, status = load_grist_data()
-    if not grist_df.empty:
-        # Find column names in Grist (case-insensitive search for IDs)
-        # Grist API returns Column IDs, which might be 'work_id', 'workid', 'Work_id', etc.
-        cols = grist_df.columns.tolist()
-        
-        work_id_col = next((c for c in cols if c.lower() == 'work_id'), None)
-        title_col = next((c for c in cols if c.lower() == 'titre'), None)
-        axis_col = next((c for c in cols if c.lower() in ['axe_retenu', 'axe retenu', 'axe_retenu_2']), None)
-        
-        if axis_col:
-            if work_id_col:
-                # Primary match: use work_id
-                cols_to_match = [work_id_col, axis_col, 'grist_id']
-                grist_clean = grist_df[cols_to_match].dropna(subset=[work_id_col])
-                # Ensure work_id values are strings for matching
-                grist_clean[work_id_col] = grist_clean[work_id_col].astype(str)
-                df['work_id'] = df['work_id'].astype(str)
-                
-                grist_clean = grist_clean.rename(columns={axis_col: 'grist_val', work_id_col: 'work_id_grist'})
-                grist_clean = grist_clean.drop_duplicates(subset=['work_id_grist'], keep='last')
-                
-                df = df.merge(grist_clean, left_on='work_id', right_on='work_id_grist', how='left')
-            elif title_col:
-                # Fallback match: use normalized titles
-                df['title_norm'] = df['title'].apply(normalize_title)
-                grist_df['title_norm_grist'] = grist_df[title_col].apply(normalize_title)
-                
-                cols_to_match = ['title_norm_grist', axis_col, 'grist_id']
-                grist_clean = grist_df[cols_to_match].dropna(subset=['title_norm_grist'])
-                grist_clean = grist_clean.rename(columns={axis_col: 'grist_val'})
-                grist_clean = grist_clean.drop_duplicates(subset=['title_norm_grist'], keep='last')
-                
-                df = df.merge(grist_clean, left_on='title_norm', right_on='title_norm_grist', how='left')
-                df = df.drop(columns=['title_norm', 'title_norm_grist'])
-            
-            # A record is "corrected" ONLY if the Grist value exists AND is different from the IA prediction
-            if 'grist_val' in df.columns:
-                df['is_corrected'] = df.apply(
-                    lambda row: pd.notna(row['grist_val']) and row['grist_val'] != row['prediction_ia'], 
-                    axis=1
-                )
-                
-                # Update the axis to show: Grist value if it exists, else IA prediction
-                df['chosen_axis'] = df['grist_val'].fillna(df['prediction_ia'])
-    elif status != "OK":
-        st.sidebar.error(f"⚠️ Grist Load Error: {status}")
-        st.sidebar.info("Vérifiez GRIST_DOC_ID et GRIST_TABLE_NAME.")
-        
-    # Merge categories if needed (ensure uniform naming)
-    df['chosen_axis'] = df['chosen_axis'].replace("Non classé", "Autre / Non classé")
-
-    # Compute multi-axis list: all axes with score > SCORE_THRESHOLD, else fallback
-    has_grist = 'grist_val' in df.columns
-    def _compute_axes(row):
-        if has_grist and row.get('is_corrected', False) and pd.notna(row.get('grist_val')):
-            return [ax.strip() for ax in str(row['grist_val']).split('|') if ax.strip()]
-        above = [ax for ax in AXIS_NAMES if row.get(ax, 0) > SCORE_THRESHOLD]
-        return above if above else [row['chosen_axis']]
-    df['chosen_axes'] = df.apply(_compute_axes, axis=1)
+    df = prepare(pd.read_parquet(file_path), grist_df)
+
+    # Permanent researchers, resolved once per distinct author name
+    ids_long = resolve_researchers(df['authors'])
+    df['researcher_ids'] = ids_long.groupby(level=0).agg(list).reindex(df.index)
+    df['researcher_ids'] = df['researcher_ids'].apply(lambda ids: ids if isinstance(ids, list) else [])
+    df['has_permanent'] = df.index.isin(ids_long.index)
 
     return df
 
-df_raw = load_data()
+class AxesDataset:
+    """
+    Process-wide dataset: loaded once, then kept up to date with the Grist
+    mirror.  Incremental syncs only update the rows whose correction changed;
+    the frame is replaced (copy-on-write) so running sessions keep a
+    consistent snapshot.  The Grist round-trip happens outside `lock`, which
+    only guards the swap of the frame.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.mirror = GristMirror()
+        self.mirror.sync(force=True)
+        self.df = load_data(self.mirror.to_frame())
+        self.authors = build_author_options(self.df) if not self.df.empty else None
+        self.work_ids = pd.Index(self.df['work_id']) if not self.df.empty else None
+        self.queue = CorrectionQueue(self.mirror)
+        self.version = 0
+
+    @property
+    def status(self):
+        return self.mirror.status
+
+    def refresh(self, force=False):
+        changed, full = self.mirror.sync(force=force)
+        if changed is None or self.df.empty or (changed.empty and not full):
+            return
+        if full:
+            df = load_data(changed)
+            authors = build_author_options(df)
+        with self.lock:
+            if full:
+                self.authors = authors
+                self.work_ids = pd.Index(df['work_id'])
+            else:
+                # From the current frame: corrections made during the sync are kept
+                df = self.df.copy(deep=False)
+                apply_grist(df, changed)
+            # Corrections not accepted by Grist yet stay visible
+            apply_grist(df, self.queue.as_frame())
+            self.df = df
+            self.version += 1
+
+    def snapshot(self):
+        """(version, df) read together, for caches keyed on the dataset version."""
+        with self.lock:
+            return self.version, self.df
+
+    def correct(self, work_id, grist_id, axes):
+        """Queue a correction for Grist and apply it to the dataset right away."""
+        self.queue.put(grist_id, work_id, axes)
+        with self.lock:
+            positions = self.work_ids.get_indexer_for([work_id])
+            rows = self.df.index[positions[positions >= 0]]
+            # Shallow copy: only the columns written below are copied (copy-on-write)
+            df = self.df.copy(deep=False)
+            df.loc[rows, 'grist_val'] = axes
+            df.loc[rows, 'grist_id'] = grist_id
+            update_axes(df, rows)
+            self.df = df
+            self.version += 1
+
+@st.cache_resource
+def get_dataset():
+    return AxesDataset()
+
+@st.cache_resource
+def get_search_index():
+    """Full-text index over title, authors, journal, topics and abstract (Grist does not change them)."""
+    frame = pd.read_parquet(DATA_FILE, columns=['work_id', 'title', 'authors', 'journal'])
+    frame['work_id'] = frame['work_id'].astype(str)
+    if os.path.exists(TEXT_FILE):
+        texts = pd.read_parquet(TEXT_FILE, columns=['work_id', 'topics', 'abstract'])
+        texts['work_id'] = texts['work_id'].astype(str)
+        frame = frame.merge(texts, on='work_id', how='left')
+    return SearchIndex(frame)
+
+@st.cache_resource(max_entries=2)
+def get_facts(version, _df):
+    """Chart tables for one dataset version, shared by all sessions."""
+    return build_facts(_df, RESEARCHER_NAMES)
+
+perf.mark("Chargement")
+dataset = get_dataset()
+# Optional SQL engine for the sidebar filters (DATAVIZ_ENGINE=duckdb), see studies/sql_engine.py
+engine = sql_engine.get()
+dataset.refresh()
+if dataset.status != "OK" and GRIST_API_KEY:
+    st.sidebar.error(f"⚠️ Grist Load Error: {dataset.status}")
+    st.sidebar.info("Vérifiez GRIST_DOC_ID et GRIST_TABLE_NAME.")
+if dataset.queue.pending:
+    st.sidebar.caption(f"⏳ {len(dataset.queue.pending)} correction(s) en attente d'envoi vers Grist")
+    if st.sidebar.button("Envoyer maintenant"):
+        success, msg = dataset.queue.flush()
+        (st.sidebar.success if success else st.sidebar.error)(msg)
+if dataset.queue.last_error:
+    st.sidebar.error(f"⚠️ {dataset.queue.last_error}")
+    st.sidebar.info("Vérifiez que le nom de la table et de la colonne 'Axe_Retenu' sont corrects dans Grist.")
+
+dataset_version, df_raw = dataset.snapshot()
 
 if df_raw.empty:
     st.info("Aucune donnée à afficher.")
 else:
+    perf.mark("Filtres")
     st.sidebar.title("🔍 Filtres")
     
     # Range of years
-    years = sorted(df_raw['year'].unique())
+    if engine is not None:
+        years = engine.values("SELECT DISTINCT year FROM axes")
+    else:
+        years = sorted(df_raw['year'].unique())
     selected_years = st.sidebar.select_slider("Années :", options=years, value=(min(years), max(years)))
     
     # Filter by Lab
     # Labs are pipe-separated in 'labs' column
-    all_labs = set()
-    for l_str in df_raw['labs'].dropna().unique():
-        for l in l_str.split('|'):
-            if l != "Inconnu":
-                all_labs.add(l)
+    if engine is not None:
+        all_labs = engine.values("SELECT DISTINCT lab FROM (SELECT unnest(string_split(labs, '|')) AS lab FROM axes) "
+                                 "WHERE lab <> 'Inconnu'")
+    else:
+        all_labs = set()
+        for l_str in df_raw['labs'].dropna().unique():
+            for l in l_str.split('|'):
+                if l != "Inconnu":
+                    all_labs.add(l)
     
     selected_lab = st.sidebar.selectbox("Laboratoire :", ["Tous"] + sorted(list(all_labs)))
     
@@ -313,34 +576,33 @@ else:
     show_only_corrected = st.sidebar.checkbox("👁️ Voir seulement les corrections", value=False)
 
     # Filter by Author — show canonical names when filter_permanent is on
-    if filter_permanent:
-        canonical_authors = set()
-        for a_str in df_raw['authors'].dropna().unique():
-            for a in a_str.split('|'):
-                cn = get_canonical_name(a.strip())
-                if cn:
-                    canonical_authors.add(cn)
-        author_options = sorted(canonical_authors)
-    else:
-        all_authors = set()
-        for a_str in df_raw['authors'].dropna().unique():
-            for a in a_str.split('|'):
-                a = a.strip()
-                if a:
-                    all_authors.add(a)
-        author_options = sorted(all_authors)
+    author_options = dataset.authors['permanent' if filter_permanent else 'all']
     selected_author = st.sidebar.selectbox("Chercheur :", ["Tous"] + author_options)
 
-    # Applying filters
-    df = df_raw.copy()
+    perf.mark("Filtrage")
+    # Applying filters (the snapshot is never modified in place: no copy needed)
+    df = df_raw
+    if engine is not None:
+        # Columns of the parquet file (years, labs, author names) are filtered in SQL;
+        # the axes, corrections and permanent researchers only exist in the dataset
+        conds, params = ["year BETWEEN ? AND ?"], [int(selected_years[0]), int(selected_years[1])]
+        if selected_lab != "Tous":
+            conds.append("contains(labs, ?)")
+            params.append(selected_lab)
+        if selected_author != "Tous" and not filter_permanent:
+            conds.append("contains(authors, ?)")
+            params.append(selected_author)
+        rows = engine.query(f"SELECT file_row_number FROM axes WHERE {' AND '.join(conds)}", tuple(params))
+        df = df[df.index.isin(rows['file_row_number'])]
     if filter_permanent:
-        df = df[df['authors'].apply(has_permanent_researcher)]
-    df = df[(df['year'] >= selected_years[0]) & (df['year'] <= selected_years[1])]
+        df = df[df['has_permanent']]
+    if engine is None:
+        df = df[(df['year'] >= selected_years[0]) & (df['year'] <= selected_years[1])]
     
     if show_only_corrected and 'is_corrected' in df.columns:
         df = df[df['is_corrected'] == True]
     
-    if selected_lab != "Tous":
+    if selected_lab != "Tous" and engine is None:
         df = df[df['labs'].str.contains(selected_lab, na=False, regex=False)]
     
     if selected_axis != "Tous":
@@ -348,11 +610,8 @@ else:
         
     if selected_author != "Tous":
         if filter_permanent:
-            df = df[df['authors'].apply(lambda s: any(
-                get_canonical_name(a.strip()) == selected_author
-                for a in (s.split('|') if isinstance(s, str) else [])
-            ))]
-        else:
+            df = df[df.index.isin(dataset.authors['rows'].get(selected_author, []))]
+        elif engine is None:
             df = df[df['authors'].str.contains(selected_author, na=False, regex=False)]
     
     # --- Main Content ---
@@ -367,15 +626,22 @@ else:
 
     tab_dataviz, tab_publications = st.tabs(["📈 Dataviz", "📑 Publications"])
 
+    perf.mark("Dataviz")
     with tab_dataviz:
-        # Explode chosen_axes so each (publication, axis) pair is one row
-        df_exp = df.explode('chosen_axes').rename(columns={'chosen_axes': 'axe'})
+        # Long tables built once per dataset version, restricted to the filtered publications
+        with perf.section("Tables des graphiques"):
+            facts = get_facts(dataset_version, df_raw)
+        def selected_facts(name):
+            table = facts[name]
+            return table[table.index.isin(df.index)]
+
+        axes_df = selected_facts('axes')
 
         c1, c2 = st.columns(2)
 
         with c1:
             st.subheader("Répartition par Axes")
-            axis_counts = df_exp['axe'].value_counts().reset_index()
+            axis_counts = axes_df['axe'].value_counts().reset_index()
             axis_counts.columns = ['Axe', 'Nombre']
             fig_axis = px.pie(axis_counts, values='Nombre', names='Axe', hole=0.4,
                              color='Axe', color_discrete_map=AXIS_COLOR_MAP)
@@ -383,7 +649,7 @@ else:
 
         with c2:
             st.subheader("Évolution Temporelle")
-            evo_df = df_exp.groupby(['year', 'axe']).size().reset_index(name='Publications')
+            evo_df = axes_df.groupby(['year', 'axe']).size().reset_index(name='Publications')
             fig_evo = px.area(evo_df, x='year', y='Publications', color='axe',
                              color_discrete_map=AXIS_COLOR_MAP)
             fig_evo.update_layout(xaxis_type='category', legend_title_text='Axe')
@@ -395,9 +661,7 @@ else:
 
         with c3:
             st.subheader("Dominance par Labo")
-            lab_df = df_exp.copy()
-            lab_df = lab_df.assign(lab=lab_df['labs'].str.split('|')).explode('lab')
-            lab_df = lab_df[lab_df['lab'] != "Inconnu"]
+            lab_df = selected_facts('labs')
 
             if not lab_df.empty:
                 lab_axis_stats = lab_df.groupby(['lab', 'axe']).size().reset_index(name='Count')
@@ -411,9 +675,7 @@ else:
 
         with c4:
             st.subheader("Top Chercheurs Nantais")
-            author_df = df_exp.copy()
-            author_df = author_df.assign(author=author_df['authors'].str.split('|')).explode('author')
-            author_df = author_df[author_df['author'].str.strip() != ""]
+            author_df = selected_facts('authors')
 
             if not author_df.empty:
                 top_authors_list = author_df['author'].value_counts().head(15).index.tolist()
@@ -428,11 +690,7 @@ else:
 
         with c5:
             st.subheader("Top Permanents Centrale Nantes")
-            perm_df = df_exp.copy()
-            perm_df = perm_df.assign(author=perm_df['authors'].str.split('|')).explode('author')
-            perm_df['author'] = perm_df['author'].str.strip()
-            perm_df['canonical'] = perm_df['author'].apply(get_canonical_name)
-            perm_df = perm_df[perm_df['canonical'].notna()]
+            perm_df = selected_facts('researchers')
 
             if not perm_df.empty:
                 top_perm_list = perm_df['canonical'].value_counts().head(15).index.tolist()
@@ -445,13 +703,44 @@ else:
             else:
                 st.write("Aucune donnée chercheur permanent disponible.")
 
-    with tab_publications:
-        search_query = st.text_input("🔍 Rechercher une publication par titre ou auteur :", "")
-
-        df_pub = df.copy()
-        if search_query:
-            df_pub = df_pub[df_pub['title'].str.contains(search_query, case=False, na=False) |
-                    df_pub['authors'].str.contains(search_query, case=False, na=False)]
+    def submit_correction(work_id, grist_id):
+        """Button callback: runs before the fragment rerun, which then shows the new axes."""
+        new_axes = st.session_state.get(f"select_{work_id}")
+        if not new_axes:
+            message = ("Sélectionnez au moins un axe.", "⚠️")
+        elif not GRIST_API_KEY:
+            message = ("Clé API Grist manquante.", "⚠️")
+        elif grist_id is None or pd.isna(grist_id):
+            message = ("ID Grist manquant (la publication n'a pas été trouvée dans Grist).", "⚠️")
+        else:
+            dataset.correct(work_id, grist_id, "|".join(new_axes))
+            message = (f"Correction enregistrée ! Elle sera envoyée à Grist avec les autres dans {GRIST_FLUSH_DELAY} s", "✅")
+        # Shown by the fragment rerun (callbacks should not display elements)
+        st.session_state['correction_message'] = message
+
+    @perf.fragment
+    def render_publications(selected_rows):
+        """
+        Publications list: search, pagination, correction widgets and export.
+        Runs as a fragment, so interacting with it does not rerun the sidebar
+        filters and the charts.
+        """
+        # Current values of the filtered rows, including corrections made since the last full run
+        _, df_now = dataset.snapshot()
+        df = df_now.loc[selected_rows]
+        if 'correction_message' in st.session_state:
+            text, icon = st.session_state.pop('correction_message')
+            st.toast(text, icon=icon)
+
+        search_query = st.text_input("🔍 Rechercher une publication (titre, auteurs, revue, sujets, résumé) :", "")
+
+        df_pub = df
+        ranked = get_search_index().search(search_query)
+        if ranked is not None:
+            # Keep the filtered publications, best matches first
+            rank = pd.Series(np.arange(len(ranked)), index=ranked)
+            df_pub = df[df['work_id'].isin(ranked)]
+            df_pub = df_pub.iloc[np.argsort(df_pub['work_id'].map(rank).to_numpy(), kind='stable')]
 
         # Pagination
         PAGE_SIZE = 10
@@ -467,8 +756,10 @@ else:
             start_idx = (page - 1) * PAGE_SIZE
             end_idx = start_idx + PAGE_SIZE
             df_page = df_pub.iloc[start_idx:end_idx]
+            page_texts = load_texts(tuple(df_page['work_id'].astype(str)))
 
             for idx, row in df_page.iterrows():
+                text = page_texts.get(str(row['work_id']), {})
                 with st.expander(f"📌 {row['title']} ({row['year']})"):
                     st.write(f"**👥 Auteurs :** {row['authors']}")
                     links = [f"[OpenAlex](https://openalex.org/{row['work_id']})"]
@@ -481,9 +772,9 @@ else:
                     if row.get('is_corrected'):
                         st.success("✅ Ces axes ont été validés/corrigés manuellement.")
 
-                    st.write(f"**🧠 Motivation IA :** {row['motivation']}")
-                    st.write(f"**🔬 Sujets / Disciplines :** {row['topics']} | {row['subfields']}")
-                    st.info(f"**📝 Résumé :** {row['abstract']}")
+                    st.write(f"**🧠 Motivation IA :** {text.get('motivation', '')}")
+                    st.write(f"**🔬 Sujets / Disciplines :** {text.get('topics', '')} | {text.get('subfields', '')}")
+                    st.info(f"**📝 Résumé :** {text.get('abstract', '')}")
 
                     # Correction part
                     st.divider()
@@ -497,24 +788,25 @@ else:
                         key=f"select_{row['work_id']}"
                     )
 
-                    if st.button("Mettre à jour dans Grist", key=f"btn_{row['work_id']}"):
-                        if not new_axes:
-                            st.warning("Sélectionnez au moins un axe.")
-                        else:
-                            success, msg = update_grist_axis(row.get('grist_id'), "|".join(new_axes))
-                            if success:
-                                st.balloons()
-                                st.success("Synchronisation avec Grist réussie ! (L'affichage sera mis à jour au prochain rafraîchissement)")
-                                st.cache_data.clear()
-                            else:
-                                st.error(f"⚠️ {msg}")
-                                st.info("Vérifiez que le nom de la table et de la colonne 'Axe_Retenu' sont corrects dans Grist.")
+                    st.button("Mettre à jour dans Grist", key=f"btn_{row['work_id']}",
+                              on_click=submit_correction, args=(row['work_id'], row.get('grist_id')))
 
         st.divider()
-        csv = df_pub.to_csv(index=False).encode('utf-8')
+        df_export = df_pub
+        if st.checkbox("Inclure résumés, motivations et sujets dans l'export", value=False):
+            export_texts = load_texts(tuple(df_pub['work_id'].astype(str)))
+            texts_df = pd.DataFrame.from_dict(export_texts, orient='index', columns=TEXT_COLUMNS)
+            df_export = df_pub.join(texts_df, on='work_id')
+        csv = df_export.to_csv(index=False).encode('utf-8')
         st.download_button(
             label="📥 Télécharger la sélection actuelle (CSV)",
             data=csv,
             file_name='publications_centrale_filtrees.csv',
             mime='text/csv',
         )
+
+    perf.mark("Publications")
+    with tab_publications:
+        render_publications(df.index)
+
+perf.panel()
@@ -0,0 +1,176 @@
+import numpy as np
+import pandas as pd
+
+from process_axes import AXIS_NAMES, MODEL_COLUMNS, MODEL_THRESHOLD
+
+# =============================================================================
+# DATASET PREPARATION — Grist corrections and multi-axis assignment
+#
+# Column-wise operations only, shared by app_axes.py and bench_load.py.
+# =============================================================================
+
+UNCLASSIFIED = "Autre / Non classé"
+SCORE_THRESHOLD = 1.0  # axes with keyword score strictly above this are included
+# Possible IDs of the axis column ('Axe Retenu' in the CSV export)
+GRIST_AXIS_COLS = ['axe_retenu', 'axe retenu', 'axe_retenu_2']
+
+# One axis list per combination of axes above SCORE_THRESHOLD (bit j = AXIS_NAMES[j])
+_AXES_BY_CODE = np.empty(1 << len(AXIS_NAMES), dtype=object)
+for _code in range(len(_AXES_BY_CODE)):
+    _AXES_BY_CODE[_code] = [ax for j, ax in enumerate(AXIS_NAMES) if _code >> j & 1]
+
+
+def normalize_titles(titles):
+    """Normalize titles for matching: lowercase, no accents, no special chars."""
+    titles = pd.Series(titles, dtype=object)
+    # Non-string titles (None, NaN) give NaN through .str, then ""
+    return (titles.str.lower()
+            .str.normalize('NFD')
+            .str.replace(r'[^a-z0-9]', '', regex=True)
+            .fillna(""))
+
+
+def axes_above(df, use_model=True):
+    """
+    Boolean matrix (rows of df × AXIS_NAMES) of the axes above threshold:
+    model probability > MODEL_THRESHOLD where the model chose the axis,
+    keyword score > SCORE_THRESHOLD elsewhere (everywhere if not use_model).
+    Shared by update_axes, train_axes.py and bench_axes.py.
+    """
+    above = df.reindex(columns=AXIS_NAMES).fillna(0).to_numpy() > SCORE_THRESHOLD
+    if use_model and 'by_model' in df.columns:
+        by_model = df['by_model'].fillna(False).to_numpy(dtype=bool)
+        above[by_model] = df.reindex(columns=MODEL_COLUMNS).to_numpy(dtype=float)[by_model] > MODEL_THRESHOLD
+    return above
+
+
+def split_axes(values):
+    """Pipe-separated Grist values → lists of axes (each distinct value is split once)."""
+    lists = {v: [ax.strip() for ax in str(v).split('|') if ax.strip()] for v in values.dropna().unique()}
+    return values.map(lists)
+
+
+def grist_matches(grist_df):
+    """
+    Extract (match_key, grist_val, grist_id) from Grist records.  Returns the
+    matches and the name of the dataset column to match on ('work_id', or the
+    normalized title as a fallback), or (None, None) if no axis column exists.
+    """
+    # Find column names in Grist (case-insensitive search for IDs)
+    # Grist API returns Column IDs, which might be 'work_id', 'workid', 'Work_id', etc.
+    cols = grist_df.columns.tolist()
+    work_id_col = next((c for c in cols if c.lower() == 'work_id'), None)
+    title_col = next((c for c in cols if c.lower() == 'titre'), None)
+    axis_col = next((c for c in cols if c.lower() in GRIST_AXIS_COLS), None)
+
+    if not axis_col:
+        return None, None
+    if work_id_col:
+        # Primary match: use work_id
+        matches = grist_df[[work_id_col, axis_col, 'grist_id']].dropna(subset=[work_id_col])
+        matches.columns = ['match_key', 'grist_val', 'grist_id']
+        matches['match_key'] = matches['match_key'].astype(str)
+        key = 'work_id'
+    elif title_col:
+        # Fallback match: use normalized titles
+        matches = pd.DataFrame({
+            'match_key': normalize_titles(grist_df[title_col]).to_numpy(),
+            'grist_val': grist_df[axis_col].to_numpy(),
+            'grist_id': grist_df['grist_id'].to_numpy(),
+        })
+        key = 'title_norm'
+    else:
+        return None, None
+    matches = matches[matches['match_key'] != ""]
+    return matches.drop_duplicates(subset=['match_key'], keep='last'), key
+
+
+def update_axes(df, rows=None):
+    """Recompute is_corrected / chosen_axis / chosen_axes for the given row labels (default: all)."""
+    sub = df if rows is None else df.loc[rows]
+    grist_val = sub['grist_val']
+
+    # A record is "corrected" ONLY if the Grist value exists AND is different from the IA prediction
+    is_corrected = grist_val.notna() & (grist_val != sub['prediction_ia'])
+    # Axis to show: Grist value if it exists, else IA prediction (uniform naming)
+    chosen_axis = grist_val.fillna(sub['prediction_ia']).replace("Non classé", UNCLASSIFIED)
+
+    # Multi-axis list: Grist correction, else all axes above threshold, else chosen_axis
+    codes = axes_above(sub) @ (1 << np.arange(len(AXIS_NAMES)))
+    chosen_axes = pd.Series(_AXES_BY_CODE[codes], index=sub.index, dtype=object)
+    chosen_axes = chosen_axes.where(codes != 0, chosen_axis.map({v: [v] for v in chosen_axis.unique()}))
+    chosen_axes = chosen_axes.where(~is_corrected, split_axes(grist_val))
+
+    if rows is None:
+        df['is_corrected'] = is_corrected.astype(bool)
+        df['chosen_axis'] = chosen_axis
+        df['chosen_axes'] = chosen_axes
+    else:
+        df.loc[rows, 'is_corrected'] = is_corrected.astype(bool)
+        df.loc[rows, 'chosen_axis'] = chosen_axis
+        df.loc[rows, 'chosen_axes'] = chosen_axes
+
+
+def apply_grist(df, grist_df):
+    """
+    Apply Grist records (all of them, or only the changed ones after an
+    incremental sync) to the dataset in place.  Only matched rows are touched.
+    """
+    if grist_df is None or grist_df.empty:
+        return
+    matches, key = grist_matches(grist_df)
+    if matches is None:
+        return
+    if key == 'title_norm' and 'title_norm' not in df.columns:
+        df['title_norm'] = normalize_titles(df['title']).to_numpy()
+    matches = matches.set_index('match_key')
+    hit = df[key].isin(matches.index)
+    if not hit.any():
+        return
+    rows = df.index[hit]
+    df.loc[rows, 'grist_val'] = df.loc[rows, key].map(matches['grist_val']).to_numpy()
+    df.loc[rows, 'grist_id'] = df.loc[rows, key].map(matches['grist_id']).to_numpy()
+    update_axes(df, rows)
+
+
+def prepare(df, grist_df=None):
+    """Add the IA prediction, the Grist corrections and the multi-axis list to the analytics table."""
+    df['work_id'] = df['work_id'].astype(str)
+    # Store the initial IA prediction
+    df['prediction_ia'] = df['chosen_axis']
+    df['grist_val'] = pd.Series(None, index=df.index, dtype=object)
+    df['grist_id'] = pd.Series(None, index=df.index, dtype=object)
+    update_axes(df)
+    apply_grist(df, grist_df)
+    return df
+
+
+# =============================================================================
+# CHART TABLES
+# =============================================================================
+
+
+def build_facts(df, researcher_names):
+    """
+    Long tables behind the dashboard charts, indexed by the row labels of df:
+    one row per (publication, axis) with its year, and one per (publication,
+    axis, lab), (publication, axis, author) and (publication, axis, permanent
+    researcher).  The charts select the filtered publications by row label.
+    """
+    axes = df[['year', 'chosen_axes']].explode('chosen_axes').rename(columns={'chosen_axes': 'axe'})
+
+    labs = axes[['axe']].assign(lab=df['labs'].reindex(axes.index).str.split('|')).explode('lab')
+    labs = labs[labs['lab'] != "Inconnu"]
+
+    authors = axes[['axe']].assign(author=df['authors'].reindex(axes.index).str.split('|')).explode('author')
+    authors = authors[authors['author'].str.strip() != ""]
+
+    researchers = axes[['axe']].assign(researcher=df['researcher_ids'].reindex(axes.index)).explode('researcher')
+    researchers = researchers.dropna(subset=['researcher'])
+    names = np.asarray(researcher_names, dtype=object)
+    researchers = pd.DataFrame({
+        'axe': researchers['axe'],
+        'canonical': names[researchers['researcher'].astype(int).to_numpy()],
+    }, index=researchers.index)
+
+    return {'axes': axes, 'labs': labs, 'authors': authors, 'researchers': researchers}
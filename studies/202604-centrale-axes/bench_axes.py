@@ -0,0 +1,129 @@
+import argparse
+import datetime
+import json
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from process_axes import AXIS_NAMES, MODEL_FILE, apply_model, classify_features, keywords_hash, load_model
+from train_axes import DATA_FILE, load_corrections, load_works, parse_axes, shown_axes
+
+# =============================================================================
+# BENCHMARK — classification quality and throughput against Grist
+#
+# Replays the classification of process_axes.py on the parquet snapshot
+# (centrale_axes_data.parquet and its text table, both in the repository):
+# the keyword scoring on the topics and subfields of each work, then the
+# optional model, timed over all works.  The predicted axes of a work follow
+# the dashboard rule (axes_data.axes_above, else chosen_axis).  OpenAlex
+# fields are not kept in the snapshot, so keywords that only match a field
+# name score lower here than in process_axes.py: compare runs on the same
+# snapshot.
+# =============================================================================
+
+
+def snapshot_features(works: pd.DataFrame) -> list[dict]:
+    """Records of the snapshot with the topic names given to the keyword scoring."""
+    features = works.to_dict("records")
+    for f in features:
+        f["topic_names"] = [name for col in ("topics", "subfields") if isinstance(f.get(col), str)
+                            for name in f[col].split("|") if name]
+    return features
+
+
+def classify_fixture(features: list[dict], model=None) -> list[dict]:
+    """Same steps as process_data: keyword scoring, then the model where it is confident."""
+    classifications = [classify_features(f["topic_names"]) for f in features]
+    if model is not None:
+        classifications = apply_model(model, features, classifications)
+    return classifications
+
+
+def score(predicted: list[set], expected: list[set]) -> dict:
+    """Per-axis precision / recall / F1 over multi-label sets."""
+    per_axis = {}
+    for axis in AXIS_NAMES:
+        tp = sum(axis in p and axis in e for p, e in zip(predicted, expected))
+        fp = sum(axis in p and axis not in e for p, e in zip(predicted, expected))
+        fn = sum(axis not in p and axis in e for p, e in zip(predicted, expected))
+        precision = tp / (tp + fp) if tp + fp else 0.0
+        recall = tp / (tp + fn) if tp + fn else 0.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        per_axis[axis] = {
+            "precision": round(precision, 4), "recall": round(recall, 4), "f1": round(f1, 4),
+            "tp": tp, "fp": fp, "fn": fn, "support": tp + fn,
+        }
+    return per_axis
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the axis classifier against Grist ground truth.")
+    parser.add_argument("--data", default=str(DATA_FILE), help="parquet produced by process_axes.py")
+    parser.add_argument("--text", help="text table (default: derived from --data, e.g. centrale_axes_text.parquet)")
+    parser.add_argument("--grist-csv", required=True, help="CSV export of the Grist corrections table")
+    parser.add_argument("--report", default="bench_axes_report.json", help="JSON report to write")
+    parser.add_argument("--no-model", action="store_true", help=f"ignore {MODEL_FILE.name}")
+    parser.add_argument("--repeat", type=int, default=3, help="timing repetitions (best run is kept)")
+    parser.add_argument("--label", default="", help="free-text label stored in the report")
+    args = parser.parse_args()
+
+    works = load_works(args.data, args.text)
+    if "topics" not in works.columns:
+        raise SystemExit(f"Pas de table des textes (topics, sous-disciplines) pour {args.data}.")
+    features = snapshot_features(works)
+    model = None if args.no_model else load_model()
+
+    timings = []
+    for _ in range(max(1, args.repeat)):
+        start = time.perf_counter()
+        classifications = classify_fixture(features, model)
+        timings.append(time.perf_counter() - start)
+    elapsed = min(timings)
+
+    # Keyword scores, chosen_axis and, with a model, by_model and its probabilities
+    columns = list(classifications[0]) if classifications else ["chosen_axis"]
+    predictions = pd.DataFrame(classifications, columns=columns).assign(work_id=works["work_id"].to_numpy())
+    predictions["predicted"] = shown_axes(predictions, predictions["chosen_axis"])
+    all_predicted = predictions["predicted"].tolist()
+    labelled = predictions.merge(load_corrections(args.grist_csv), on="work_id", how="inner")
+    predicted = labelled["predicted"].tolist()
+    expected = [parse_axes(v) for v in labelled["axes"]]
+
+    per_axis = score(predicted, expected)
+    report = {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "label": args.label,
+        "data": str(Path(args.data).name),
+        "keywords_hash": keywords_hash(),
+        "model": MODEL_FILE.name if model is not None else None,
+        "n_works": len(features),
+        "n_labelled": len(labelled),
+        "elapsed_s": round(elapsed, 4),
+        "works_per_sec": round(len(features) / elapsed, 1) if elapsed else None,
+        # Over all works, like the dashboard; the labelled subset is not representative
+        "unclassified_rate": round(sum(not p for p in all_predicted) / len(all_predicted), 4) if all_predicted else None,
+        "unclassified_rate_labelled": round(sum(not p for p in predicted) / len(predicted), 4) if predicted else None,
+        "unclassified_rate_expected": round(sum(not e for e in expected) / len(expected), 4) if expected else None,
+        "exact_match": round(sum(p == e for p, e in zip(predicted, expected)) / len(expected), 4) if expected else None,
+        "per_axis": per_axis,
+    }
+
+    with open(args.report, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print(f"{report['n_works']} publications classées en {elapsed:.3f}s ({report['works_per_sec']} pub/s)")
+    print(f"{report['n_labelled']} publications annotées dans Grist")
+    if all_predicted:
+        print(f"Taux 'Autre / Non classé' : {report['unclassified_rate']:.1%} sur toutes les publications")
+    if predicted:
+        print(f"  sur les publications annotées : {report['unclassified_rate_labelled']:.1%} "
+              f"(attendu : {report['unclassified_rate_expected']:.1%})")
+    print(f"{'Axe':55s} {'Préc.':>6s} {'Rappel':>6s} {'F1':>6s} {'Supp.':>6s}")
+    for axis, m in per_axis.items():
+        print(f"{axis:55s} {m['precision']:6.2f} {m['recall']:6.2f} {m['f1']:6.2f} {m['support']:6d}")
+    print(f"Rapport écrit dans {args.report}")
+
+
+if __name__ == "__main__":
+    main()
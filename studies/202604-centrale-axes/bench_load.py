@@ -0,0 +1,75 @@
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from axes_data import prepare
+from train_axes import DATA_FILE
+
+# =============================================================================
+# BENCHMARK — scaling of the dataset preparation done by app_axes.load_data()
+#
+# The analytics table is resampled to N publications (unique work_ids) and
+# a Grist table correcting a quarter of them is generated.  prepare() must
+# stay column-wise: the time per publication should not grow with N.
+# =============================================================================
+
+
+def make_fixture(base: pd.DataFrame, n: int, by_title=False, seed=0):
+    rng = np.random.default_rng(seed)
+    df = base.iloc[rng.integers(0, len(base), n)].reset_index(drop=True)
+    df["work_id"] = [f"W{i}" for i in range(n)]
+    df["title"] = df["title"].fillna("") + " " + df["work_id"]
+
+    corrected = df.sample(frac=0.25, random_state=seed)
+    axes = base["chosen_axis"].dropna().unique()
+    grist_df = pd.DataFrame({
+        "Titre" if by_title else "work_id": corrected["title" if by_title else "work_id"].to_numpy(),
+        "Axe_Retenu": rng.choice(axes, len(corrected)),
+        "grist_id": np.arange(1, len(corrected) + 1),
+    })
+    return df, grist_df
+
+
+def time_prepare(df, grist_df, repeat):
+    timings = []
+    for _ in range(repeat):
+        work = df.copy()
+        start = time.perf_counter()
+        prepare(work, grist_df)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that load_data() preparation scales linearly.")
+    parser.add_argument("--data", default=str(DATA_FILE))
+    parser.add_argument("--sizes", default="1000,10000,100000", help="comma-separated numbers of publications")
+    parser.add_argument("--by-title", action="store_true", help="match Grist records on titles instead of work_id")
+    parser.add_argument("--repeat", type=int, default=3, help="timing repetitions (best run is kept)")
+    parser.add_argument("--max-ratio", type=float, default=3.0,
+                        help="fail if the time per publication grows more than this between the smallest and largest size")
+    parser.add_argument("--report", help="JSON report to write")
+    args = parser.parse_args()
+
+    base = pd.read_parquet(args.data)
+    results = []
+    for n in [int(x) for x in args.sizes.split(",")]:
+        df, grist_df = make_fixture(base, n, by_title=args.by_title)
+        elapsed = time_prepare(df, grist_df, args.repeat)
+        results.append({"n": n, "elapsed_s": round(elapsed, 4), "us_per_pub": round(elapsed / n * 1e6, 2)})
+        print(f"{n:>8d} publications : {elapsed:7.3f}s ({results[-1]['us_per_pub']} µs/publication)")
+
+    ratio = results[-1]["us_per_pub"] / results[0]["us_per_pub"]
+    print(f"Coût par publication {results[-1]['n']} / {results[0]['n']} : x{ratio:.2f}")
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump({"by_title": args.by_title, "results": results, "ratio": round(ratio, 2)}, f, indent=2)
+    if ratio > args.max_ratio:
+        raise SystemExit(f"Croissance non linéaire : x{ratio:.2f} > x{args.max_ratio}")
+
+
+if __name__ == "__main__":
+    main()
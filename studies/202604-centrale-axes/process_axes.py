@@ -1,5 +1,13 @@
+import argparse
+import hashlib
 import json
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 from tqdm import tqdm
 
 # =============================================================================
@@ -166,106 +174,373 @@ def classify_by_topics(topic_names: list[str]) -> tuple[str | None, str, dict]:
     return None, "", scores
 
 
+# =============================================================================
+# CLASSIFICATION — TRAINED MODEL (optional, see train_axes.py)
+# A TF-IDF vectorizer + one logistic regression per axis, fitted on the axes
+# validated/corrected in Grist.  All works are scored in one sparse matrix
+# product; keyword matching remains the fallback when no model file exists or
+# when the model is not confident for a work.
+# =============================================================================
+MODEL_FILE = Path(__file__).parent / "axes_model.joblib"
+MODEL_THRESHOLD = 0.5
+# The axis score columns always hold the keyword hit counts; the model
+# probabilities go to their own columns, and by_model tells which of the two
+# chose the axis of a work.
+MODEL_COLUMNS = [f"{ax} (modèle)" for ax in AXIS_NAMES]
+
+
+def model_text(features) -> str:
+    """Text fed to the TF-IDF model (same recipe at training and inference)."""
+    parts = [features.get(k) for k in ("title", "topics", "subfields", "abstract")]
+    return ". ".join(p.replace("|", ". ") for p in parts if isinstance(p, str) and p)
+
+
+def load_model(path=MODEL_FILE):
+    """Load the model saved by train_axes.py, or None if there is none."""
+    path = Path(path)
+    if not path.exists():
+        return None
+    import joblib
+
+    model = joblib.load(path)
+    if list(model["axes"]) != AXIS_NAMES:
+        print(f"Ignoring {path}: trained on a different list of axes.")
+        return None
+    return model
+
+
+def trained_axes(model) -> np.ndarray:
+    """Boolean mask of the axes learned by the model (models saved before the mask: all)."""
+    return np.asarray(model.get("trained", np.ones(len(AXIS_NAMES), dtype=bool)))
+
+
+def predict_proba(model, texts) -> np.ndarray:
+    """
+    (n_works, n_axes) probabilities, from one batched sparse product.  NaN
+    for the axes the model did not learn (no positive or negative example).
+    """
+    X = model["vectorizer"].transform(texts)
+    logits = X @ model["coef"].T + model["intercept"]
+    probas = 1.0 / (1.0 + np.exp(-logits))
+    probas[:, ~trained_axes(model)] = np.nan
+    return probas
+
+
+def apply_model(model, features, classifications):
+    """
+    Override keyword classifications where the model is confident.  Keyword
+    scores are kept; the probabilities are added as MODEL_COLUMNS.  Works
+    whose keyword axis was not learned by the model keep their keyword axis.
+    """
+    probas = predict_proba(model, [model_text(f) for f in features])
+    best = np.nan_to_num(probas, nan=-1.0).argmax(axis=1)
+    unlearned = {ax for ax, learned in zip(AXIS_NAMES, trained_axes(model)) if not learned}
+    out = []
+    for classif, row, b in zip(classifications, probas, best):
+        classif = {**classif, "by_model": False, **{col: float(p) for col, p in zip(MODEL_COLUMNS, row)}}
+        if not row[b] >= MODEL_THRESHOLD or classif["chosen_axis"] in unlearned:
+            out.append(classif)
+            continue
+        out.append({
+            **classif,
+            "chosen_axis": AXIS_NAMES[b],
+            "motivation": f"[Modèle TF-IDF] Probabilité {row[b]:.2f} (entraîné sur les corrections Grist).",
+            "by_model": True,
+        })
+    return out
+
+
+# =============================================================================
+# FEATURE EXTRACTION
+# Everything that only depends on the OpenAlex record (abstract, topics, labs,
+# authors, metadata).  Cached per work, keyed by work_id + updated_date.
+# =============================================================================
+
+def extract_features(work) -> dict:
+    """Flatten one OpenAlex work into the fields needed for classification/output."""
+    work_full_id = work.get("id")
+    work_id = work_full_id.split("/")[-1] if work_full_id else "unknown"
+
+    # Collect all topic-related names from OpenAlex
+    topic_display_names = []
+    subfields_list = []
+    topics_list = []
+    for t in work.get("topics", []):
+        if t.get("display_name"):
+            topic_display_names.append(t["display_name"])
+            topics_list.append(t["display_name"])
+        if t.get("subfield", {}).get("display_name"):
+            sn = t["subfield"]["display_name"]
+            topic_display_names.append(sn)
+            subfields_list.append(sn)
+        if t.get("field", {}).get("display_name"):
+            topic_display_names.append(t["field"]["display_name"])
+
+    # ── Lab & Authors ────────────────────────────────────────────────────────
+    nantes_authors = []
+    # dict rather than set: keeps the lab order stable across processes
+    # (set order of str depends on the per-process hash seed)
+    author_labs = {}
+
+    for auth in work.get("authorships", []):
+        author_name = auth.get("author", {}).get("display_name", "Unknown")
+        is_centrale = False
+        labs_for_this_author = []
+
+        for inst in auth.get("institutions", []):
+            inst_full_id = inst.get("id")
+            inst_id = inst_full_id.split("/")[-1] if inst_full_id else ""
+            if inst_id == "I100445878":
+                is_centrale = True
+            if inst_id in LAB_ID_MAP:
+                labs_for_this_author.append(LAB_ID_MAP[inst_id])
+            for lid_full in inst.get("lineage", []):
+                lid = lid_full.split("/")[-1] if lid_full else ""
+                if lid in LAB_ID_MAP:
+                    labs_for_this_author.append(LAB_ID_MAP[lid])
+
+        if is_centrale or labs_for_this_author:
+            nantes_authors.append(author_name)
+            for lab in labs_for_this_author:
+                author_labs[lab] = None
+
+    # ── Publication metadata ─────────────────────────────────────────────────
+    primary_loc = work.get("primary_location") or {}
+    source_data = primary_loc.get("source") or {}
+    journal = source_data.get("display_name", "Inconnu")
+    issn_list = source_data.get("issn", [])
+    issn = issn_list[0] if issn_list else "N/A"
+    labs_str = "|".join(list(author_labs)) if author_labs else "Inconnu"
+
+    return {
+        "work_id": work_id,
+        "updated_date": work.get("updated_date") or "",
+        "doi": work.get("doi"),
+        "title": work.get("title", ""),
+        "year": work.get("publication_year"),
+        "authors": "|".join(nantes_authors),
+        "labs": labs_str,
+        "journal": journal,
+        "issn": issn,
+        "subfields": "|".join(dict.fromkeys(subfields_list)),
+        "topics": "|".join(dict.fromkeys(topics_list)),
+        "abstract": get_abstract_text(work.get("abstract_inverted_index")),
+        "topic_names": topic_display_names,
+    }
+
+
+def classify_features(topic_names) -> dict:
+    """Run the (cheap) keyword scoring step on a work's extracted topic names."""
+    chosen_axis, motivation, l1_scores = classify_by_topics(list(topic_names))
+
+    if chosen_axis is None:
+        chosen_axis = "Autre / Non classé"
+        motivation = "Aucune correspondance sur les topics OpenAlex."
+    axis_scores = {ax: float(l1_scores.get(ax, 0)) for ax in AXIS_NAMES}
+
+    return {"chosen_axis": chosen_axis, "motivation": motivation, **axis_scores}
+
+
+# =============================================================================
+# INCREMENTAL CACHE
+# - features_<hash>.parquet : one row per work (work_id, updated_date, ...)
+#   for one version of the extraction (LAB_ID_MAP and EXTRACT_VERSION).
+# - classification_<hash>_<hash>.parquet : scores for one version of the
+#   extraction and of the keyword dictionaries, so that editing
+#   TOPIC_KEYWORDS only re-runs the scoring.
+#   Only the current versions are kept: the others are deleted on write.
+# Records are written and read through Arrow with the types of the Python
+# values, so a cached record is identical to a fresh one (int year with
+# nulls, None for missing strings, list of topic names).
+# =============================================================================
+CACHE_DIR = Path(__file__).parent / ".axes_cache"
+# Bump when extract_features changes what it returns for the same OpenAlex record
+EXTRACT_VERSION = 1
+
+
+def extract_hash() -> str:
+    """Short stable hash of the feature extraction inputs (lab mapping and version)."""
+    payload = json.dumps(
+        {"labs": LAB_ID_MAP, "version": EXTRACT_VERSION},
+        sort_keys=True, ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def keywords_hash() -> str:
+    """Short stable hash of the axis list and the keyword dictionaries."""
+    payload = json.dumps(
+        {"axes": AXIS_NAMES, "keywords": TOPIC_KEYWORDS},
+        sort_keys=True, ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def _restore_record(record) -> dict:
+    """Undo the float conversion of files written by older versions (year with nulls)."""
+    year = record.get("year")
+    if isinstance(year, float):
+        record["year"] = None if np.isnan(year) else int(year)
+    return record
+
+
+def _load_cache(path) -> dict:
+    """Return {work_id: record} from a cache parquet file, or {} if absent/unreadable."""
+    if not path.exists():
+        return {}
+    try:
+        cached = pq.read_table(path).to_pylist()
+    except Exception as e:
+        print(f"Ignoring unreadable cache {path}: {e}")
+        return {}
+    return {r["work_id"]: _restore_record(r) for r in cached}
+
+
+def _save_cache(path, records):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    columns = {k: pa.array([r[k] for r in records], from_pandas=True) for k in records[0]} if records else {}
+    pq.write_table(pa.table(columns), path)
+
+
+def _prune_caches(keep):
+    """Delete the other versions of a cache file (same name up to the first '_', or unversioned)."""
+    prefix = keep.name.split("_")[0]
+    for stale in keep.parent.glob(f"{prefix}*.parquet"):
+        if stale != keep:
+            stale.unlink(missing_ok=True)
+
+
+# =============================================================================
+# PARALLEL EXECUTION
+# Works are split into contiguous chunks; results are concatenated in chunk
+# order, so the output is identical to the serial path.
+# =============================================================================
+CHUNK_SIZE = 500
+
+
+def _extract_chunk(works):
+    return [extract_features(w) for w in works]
+
+
+def _classify_chunk(topic_names_list):
+    return [classify_features(t) for t in topic_names_list]
+
+
+def _map_chunks(func, items, workers=1, chunk_size=CHUNK_SIZE):
+    """Apply func to contiguous chunks of items, serially or on a process pool."""
+    chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+    if workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(tqdm(pool.map(func, chunks), total=len(chunks), unit="chunk"))
+    else:
+        parts = [func(c) for c in tqdm(chunks, unit="chunk")]
+    return [x for part in parts for x in part]
 
 
 # =============================================================================
 # MAIN PROCESSING
+# The output is split in two parquet files:
+# - the analytics table (year, labs, authors, axes, scores...) read eagerly by
+#   the dashboard,
+# - the text table (abstract, motivation, topics, subfields) keyed by work_id,
+#   only read for the publications being displayed.
 # =============================================================================
+TEXT_COLUMNS = ["abstract", "motivation", "topics", "subfields"]
+
+
+def text_file_for(output_file) -> Path:
+    """Default path of the text table: centrale_axes_data.parquet → centrale_axes_text.parquet."""
+    output_file = Path(output_file)
+    stem = output_file.stem.removesuffix("_data")
+    return output_file.with_name(f"{stem}_text{output_file.suffix}")
+
 
-def process_data(input_file, output_file):
+def process_data(input_file, output_file, cache_dir=CACHE_DIR, use_cache=True, workers=1,
+                 model_file=MODEL_FILE, text_file=None):
     print(f"Loading {input_file}...")
     with open(input_file, "r", encoding="utf-8") as f:
         data = json.load(f)
 
     results = data.get("results", [])
-    processed_results = []
-
-    print("Processing publications...")
-    for work in tqdm(results):
+    cache_dir = Path(cache_dir)
+    features_path = cache_dir / f"features_{extract_hash()}.parquet"
+    classif_path = cache_dir / f"classification_{extract_hash()}_{keywords_hash()}.parquet"
+    feature_cache = _load_cache(features_path) if use_cache else {}
+    classif_cache = _load_cache(classif_path) if use_cache else {}
+
+    print("Extracting features...")
+    features = [None] * len(results)
+    to_extract = []
+    for i, work in enumerate(results):
         work_full_id = work.get("id")
         work_id = work_full_id.split("/")[-1] if work_full_id else "unknown"
-        title = work.get("title", "")
-        abstract = get_abstract_text(work.get("abstract_inverted_index"))
-
-        # Collect all topic-related names from OpenAlex
-        topic_display_names = []
-        subfields_list = []
-        topics_list = []
-        for t in work.get("topics", []):
-            if t.get("display_name"):
-                topic_display_names.append(t["display_name"])
-                topics_list.append(t["display_name"])
-            if t.get("subfield", {}).get("display_name"):
-                sn = t["subfield"]["display_name"]
-                topic_display_names.append(sn)
-                subfields_list.append(sn)
-            if t.get("field", {}).get("display_name"):
-                topic_display_names.append(t["field"]["display_name"])
-
-        # ── Level 1: Topic keyword matching ────────────────────────────────
-        chosen_axis, motivation, l1_scores = classify_by_topics(topic_display_names)
-
-        if chosen_axis is None:
-            chosen_axis = "Autre / Non classé"
-            motivation = "Aucune correspondance sur les topics OpenAlex."
-        axis_scores = {ax: float(l1_scores.get(ax, 0)) for ax in AXIS_NAMES}
-
-        # ── Lab & Authors ────────────────────────────────────────────────────
-        nantes_authors = []
-        author_labs = set()
-
-        for auth in work.get("authorships", []):
-            author_name = auth.get("author", {}).get("display_name", "Unknown")
-            is_centrale = False
-            labs_for_this_author = []
-
-            for inst in auth.get("institutions", []):
-                inst_full_id = inst.get("id")
-                inst_id = inst_full_id.split("/")[-1] if inst_full_id else ""
-                if inst_id == "I100445878":
-                    is_centrale = True
-                if inst_id in LAB_ID_MAP:
-                    labs_for_this_author.append(LAB_ID_MAP[inst_id])
-                for lid_full in inst.get("lineage", []):
-                    lid = lid_full.split("/")[-1] if lid_full else ""
-                    if lid in LAB_ID_MAP:
-                        labs_for_this_author.append(LAB_ID_MAP[lid])
-
-            if is_centrale or labs_for_this_author:
-                nantes_authors.append(author_name)
-                for lab in labs_for_this_author:
-                    author_labs.add(lab)
-
-        # ── Publication metadata ─────────────────────────────────────────────
-        primary_loc = work.get("primary_location") or {}
-        source_data = primary_loc.get("source") or {}
-        journal = source_data.get("display_name", "Inconnu")
-        issn_list = source_data.get("issn", [])
-        issn = issn_list[0] if issn_list else "N/A"
-        labs_str = "|".join(list(author_labs)) if author_labs else "Inconnu"
+        cached = feature_cache.get(work_id)
+        if cached is not None and cached["updated_date"] == (work.get("updated_date") or ""):
+            features[i] = cached
+        else:
+            to_extract.append(i)
+    extracted = _map_chunks(_extract_chunk, [results[i] for i in to_extract], workers)
+    for i, feats in zip(to_extract, extracted):
+        features[i] = feats
+    n_extracted = len(to_extract)
+
+    print("Classifying publications...")
+    classifications = [None] * len(features)
+    to_classify = []
+    for i, feats in enumerate(features):
+        cached = classif_cache.get(feats["work_id"])
+        if cached is not None and cached["updated_date"] == feats["updated_date"]:
+            classifications[i] = {k: v for k, v in cached.items() if k not in ("work_id", "updated_date")}
+        else:
+            to_classify.append(i)
+    classified = _map_chunks(_classify_chunk, [features[i]["topic_names"] for i in to_classify], workers)
+    for i, classif in zip(to_classify, classified):
+        classifications[i] = classif
+    n_classified = len(to_classify)
+    print(f"{n_extracted} works extracted, {n_classified} works classified "
+          f"({len(features)} total, rest from cache).")
+
+    if use_cache:
+        _save_cache(features_path, [{**f, "topic_names": list(f["topic_names"])} for f in features])
+        _save_cache(classif_path, [
+            {"work_id": f["work_id"], "updated_date": f["updated_date"], **c}
+            for f, c in zip(features, classifications)
+        ])
+        _prune_caches(features_path)
+        _prune_caches(classif_path)
+
+    # Keyword baseline, kept next to the final axis (train_axes.py compares Grist to it)
+    keyword_axes = [c["chosen_axis"] for c in classifications]
+    model = load_model(model_file) if model_file else None
+    if model is not None:
+        print(f"Scoring with trained model {model_file}...")
+        classifications = apply_model(model, features, classifications)
 
+    processed_results = []
+    for feats, classif, keyword_axis in zip(features, classifications, keyword_axes):
         processed_results.append(
             {
-                "doi": work.get("doi"),
-                "work_id": work_id,
-                "title": title,
-                "year": work.get("publication_year"),
-                "authors": "|".join(nantes_authors),
-                "labs": labs_str,
-                "journal": journal,
-                "issn": issn,
-                "subfields": "|".join(dict.fromkeys(subfields_list)),
-                "topics": "|".join(dict.fromkeys(topics_list)),
-                "abstract": abstract,
-                "chosen_axis": chosen_axis,
-                "motivation": motivation,
-                **axis_scores,
+                "doi": feats["doi"],
+                "work_id": feats["work_id"],
+                "title": feats["title"],
+                "year": feats["year"],
+                "authors": feats["authors"],
+                "labs": feats["labs"],
+                "journal": feats["journal"],
+                "issn": feats["issn"],
+                "subfields": feats["subfields"],
+                "topics": feats["topics"],
+                "abstract": feats["abstract"],
+                **classif,
+                "keyword_axis": keyword_axis,
             }
         )
 
     df = pd.DataFrame(processed_results)
-    df.to_parquet(output_file, index=False)
-    print(f"Saved {len(df)} publications to {output_file}")
+    text_file = text_file or text_file_for(output_file)
+    df.drop(columns=TEXT_COLUMNS).to_parquet(output_file, index=False)
+    df[["work_id"] + TEXT_COLUMNS].to_parquet(text_file, index=False)
+    print(f"Saved {len(df)} publications to {output_file} (+ texts in {text_file})")
 
     # CSV export for Grist import
     csv_output = "publications_centrale_axes_strategiques.csv"
@@ -281,10 +556,22 @@ def process_data(input_file, output_file):
         "motivation": "Motivation",
         "abstract": "Résumé",
     }
-    df_csv = df.rename(columns=rename_map)
+    # Internal columns (keyword baseline, model probabilities) are not part of the Grist table
+    df_csv = df.drop(columns=["keyword_axis", "by_model", *MODEL_COLUMNS], errors="ignore").rename(columns=rename_map)
     df_csv.to_csv(csv_output, index=False, encoding="utf-8")
     print(f"Exported {csv_output} for Grist import.")
 
 
 if __name__ == "__main__":
-    process_data("centrale-2022-2026.json", "centrale_axes_data.parquet")
+    parser = argparse.ArgumentParser(description="Classify OpenAlex works into Centrale Nantes strategic axes.")
+    parser.add_argument("input_file", nargs="?", default="centrale-2022-2026.json")
+    parser.add_argument("output_file", nargs="?", default="centrale_axes_data.parquet")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of worker processes (default: 1, serial)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="ignore and do not update the .axes_cache/ directory")
+    parser.add_argument("--no-model", action="store_true",
+                        help=f"ignore {MODEL_FILE.name} and use keyword matching only")
+    args = parser.parse_args()
+    process_data(args.input_file, args.output_file, use_cache=not args.no_cache, workers=args.workers,
+                 model_file=None if args.no_model else MODEL_FILE)
@@ -0,0 +1,105 @@
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+# =============================================================================
+# FULL-TEXT SEARCH — inverted index over the publications
+#
+# Tokens are accent-insensitive ("Éolien" = "eolien"), with the same rules
+# as the researcher name matching of app_axes.py.  Every query word matches
+# as a prefix; all query words must match.  Results are ranked by the sum
+# over query words of field weight × IDF, an exact token counting more than
+# a prefix.
+# =============================================================================
+
+_SPECIAL_CHARS = str.maketrans({
+    'ł': 'l', 'ø': 'o', 'ð': 'd', 'þ': 't', 'æ': 'ae', 'œ': 'oe',
+    'ß': 'ss', 'ĸ': 'k', 'ŋ': 'n', 'ı': 'i',
+})
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+FIELD_WEIGHTS = {'title': 3.0, 'authors': 3.0, 'journal': 1.5, 'topics': 1.5, 'abstract': 1.0}
+PREFIX_WEIGHT = 0.5  # weight of a token only matched as a prefix of the query word
+
+
+def normalize_text(text):
+    """Lowercase, transliterate special Latin chars, remove accents."""
+    if not isinstance(text, str):
+        return ""
+    text = text.lower().translate(_SPECIAL_CHARS)
+    return "".join(c for c in unicodedata.normalize('NFD', text) if unicodedata.category(c) != 'Mn')
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(normalize_text(text))
+
+
+class SearchIndex:
+    """
+    Inverted index token → (documents, weights), stored as sorted arrays:
+    `vocab` is the sorted vocabulary and the postings of vocab[i] are
+    docs[offsets[i]:offsets[i + 1]], so the postings of all the tokens
+    starting with a prefix are one contiguous slice.
+    """
+
+    def __init__(self, frame, key='work_id', fields=FIELD_WEIGHTS):
+        frame = frame.reset_index(drop=True)
+        self.keys = frame[key].to_numpy()
+        postings = []
+        for field, weight in fields.items():
+            if field not in frame.columns:
+                continue
+            tokens = frame[field].map(tokenize).explode().dropna()
+            postings.append(pd.DataFrame({
+                'token': tokens.to_numpy(),
+                'doc': np.asarray(tokens.index, dtype=np.int64),
+                'weight': weight,
+            }).drop_duplicates(subset=['token', 'doc']))
+        # Positional index: docs are row positions in `frame`
+        postings = (pd.concat(postings, ignore_index=True) if postings
+                    else pd.DataFrame({'token': [], 'doc': [], 'weight': []}))
+        postings = postings.groupby(['token', 'doc'], sort=True)['weight'].sum().reset_index()
+
+        self.vocab = postings['token'].unique().astype(str)
+        self.docs = postings['doc'].to_numpy(dtype=np.int64)
+        self.weights = postings['weight'].to_numpy(dtype=float)
+        starts = np.searchsorted(postings['token'].to_numpy(dtype=str), self.vocab)
+        self.offsets = np.append(starts, len(postings))
+        doc_freq = np.diff(self.offsets)
+        self.idf = np.log1p(len(self.keys) / np.maximum(doc_freq, 1))
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _term_scores(self, term):
+        """Score of each document for one query word (0 = no match)."""
+        lo = np.searchsorted(self.vocab, term, side='left')
+        # Tokens only contain [a-z0-9]: '{' sorts after all of them
+        hi = np.searchsorted(self.vocab, term + '{', side='left')
+        if lo == hi:
+            return np.zeros(len(self.keys))
+        start, end = self.offsets[lo], self.offsets[hi]
+        token_idx = np.repeat(np.arange(lo, hi), np.diff(self.offsets[lo:hi + 1]))
+        weights = self.weights[start:end] * self.idf[token_idx]
+        weights[self.vocab[token_idx] != term] *= PREFIX_WEIGHT
+        return np.bincount(self.docs[start:end], weights=weights, minlength=len(self.keys))
+
+    def search(self, query):
+        """
+        Keys of the documents matching every word of the query, best first.
+        Returns None for an empty query (no filtering).
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return None
+        total = np.zeros(len(self.keys))
+        matched = np.ones(len(self.keys), dtype=bool)
+        for term in terms:
+            scores = self._term_scores(term)
+            matched &= scores > 0
+            total += scores
+        hits = np.flatnonzero(matched)
+        return self.keys[hits[np.argsort(-total[hits], kind='stable')]]
@@ -0,0 +1,179 @@
+import argparse
+import os
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+import requests
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+
+from axes_data import axes_above
+from process_axes import AXIS_NAMES, MODEL_FILE, model_text, text_file_for
+
+# =============================================================================
+# GRIST CONFIGURATION (same table as app_axes.py)
+# =============================================================================
+GRIST_DOC_ID = "5aREUrB1kuFAcVY4GTUDfA"
+GRIST_TABLE_NAME = "Publications_centrale_axes_strategiques2"
+GRIST_BASE_URL = f"https://grist.numerique.gouv.fr/api/docs/{GRIST_DOC_ID}/tables/{GRIST_TABLE_NAME}/records"
+
+DATA_FILE = Path(__file__).parent / "centrale_axes_data.parquet"
+
+
+def _grist_api_key():
+    """GRIST_API_KEY from the environment, else from .streamlit/secrets.toml."""
+    key = os.environ.get("GRIST_API_KEY")
+    if key:
+        return key
+    secrets = Path(__file__).parent / ".streamlit" / "secrets.toml"
+    if secrets.exists():
+        import tomllib
+
+        with open(secrets, "rb") as f:
+            return tomllib.load(f).get("GRIST_API_KEY")
+    return None
+
+
+def load_corrections(csv_path=None) -> pd.DataFrame:
+    """
+    Return a DataFrame (work_id, axes) of the axes recorded in Grist, either
+    from a CSV export of the table or directly from the Grist API.
+
+    'axes' is the raw "Axe_Retenu" value (pipe-separated for multi-axis).
+    """
+    if csv_path:
+        grist_df = pd.read_csv(csv_path)
+    else:
+        api_key = _grist_api_key()
+        if not api_key:
+            raise SystemExit("GRIST_API_KEY manquante (variable d'environnement ou .streamlit/secrets.toml).")
+        response = requests.get(GRIST_BASE_URL, headers={"Authorization": f"Bearer {api_key}"}, timeout=60)
+        response.raise_for_status()
+        grist_df = pd.DataFrame([r["fields"] for r in response.json().get("records", [])])
+
+    # Column IDs (API) and labels (CSV export) differ in case/spacing
+    cols = grist_df.columns.tolist()
+    work_id_col = next((c for c in cols if c.lower() == "work_id"), None)
+    axis_col = next((c for c in cols if c.lower() in ["axe_retenu", "axe retenu", "axe_retenu_2"]), None)
+    if not work_id_col or not axis_col:
+        raise SystemExit(f"Colonnes work_id / Axe_Retenu introuvables dans Grist : {cols}")
+
+    corrections = grist_df[[work_id_col, axis_col]].dropna()
+    corrections.columns = ["work_id", "axes"]
+    corrections["work_id"] = corrections["work_id"].astype(str)
+    return corrections.drop_duplicates(subset=["work_id"], keep="last")
+
+
+def load_works(data_file=DATA_FILE, text_file=None) -> pd.DataFrame:
+    """Analytics table joined with its text table (abstract, topics...) on work_id."""
+    works = pd.read_parquet(data_file)
+    works["work_id"] = works["work_id"].astype(str)
+    text_file = Path(text_file or text_file_for(data_file))
+    if text_file.exists():
+        texts = pd.read_parquet(text_file)
+        texts["work_id"] = texts["work_id"].astype(str)
+        works = works.merge(texts, on="work_id", how="left")
+    return works
+
+
+def parse_axes(value) -> set:
+    """Set of strategic axes in a Grist "Axe_Retenu" value ("Autre" → empty set)."""
+    return {ax.strip() for ax in str(value).split("|") if ax.strip() in AXIS_NAMES}
+
+
+def shown_axes(works, fallback, use_model=True) -> list[set]:
+    """
+    Axes of each work as the dashboard shows them (axes_data.axes_above),
+    else the fallback axis (chosen_axis, or keyword_axis for the baseline).
+    """
+    above = axes_above(works, use_model)
+    return [{ax for ax, hit in zip(AXIS_NAMES, row) if hit} or parse_axes(axis)
+            for row, axis in zip(above, fallback)]
+
+
+def keyword_axes(works) -> list[set]:
+    """
+    Keyword baseline of each work: axes with a keyword score above
+    SCORE_THRESHOLD, else the keyword axis.  chosen_axis may come from a
+    previous model, so keyword_axis is used when present.
+    """
+    if "keyword_axis" in works.columns:
+        baseline = works["keyword_axis"]
+    else:
+        print("Pas de colonne keyword_axis (process_axes.py antérieur) : chosen_axis sert de référence.")
+        baseline = works["chosen_axis"]
+    return shown_axes(works, baseline, use_model=False)
+
+
+def train(texts, label_sets, C=4.0):
+    """
+    Fit the TF-IDF vectorizer and one logistic regression per axis.  Axes
+    with no positive or no negative example are not learned ("trained" is
+    False): apply_model leaves them to the keyword classification.
+    """
+    vectorizer = TfidfVectorizer(
+        lowercase=True, strip_accents="unicode", sublinear_tf=True,
+        ngram_range=(1, 2), min_df=2, max_df=0.9,
+    )
+    X = vectorizer.fit_transform(texts)
+    Y = np.array([[ax in labels for ax in AXIS_NAMES] for labels in label_sets])
+
+    coef = np.zeros((len(AXIS_NAMES), X.shape[1]))
+    intercept = np.zeros(len(AXIS_NAMES))
+    trained = np.zeros(len(AXIS_NAMES), dtype=bool)
+    for j, axis in enumerate(AXIS_NAMES):
+        n_pos = int(Y[:, j].sum())
+        if n_pos == 0 or n_pos == len(Y):
+            print(f"  {axis}: {n_pos} exemples positifs sur {len(Y)}, axe non appris (mots-clés).")
+            continue
+        trained[j] = True
+        clf = LogisticRegression(C=C, class_weight="balanced", max_iter=1000)
+        clf.fit(X, Y[:, j])
+        coef[j] = clf.coef_[0]
+        intercept[j] = clf.intercept_[0]
+        print(f"  {axis}: {n_pos} exemples positifs.")
+
+    return {
+        "axes": AXIS_NAMES,
+        "vectorizer": vectorizer,
+        "coef": coef,
+        "intercept": intercept,
+        "trained": trained,
+        "n_samples": len(texts),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the TF-IDF axis classifier on the Grist corrections.")
+    parser.add_argument("--grist-csv", help="CSV export of the Grist table (default: fetch through the API)")
+    parser.add_argument("--data", default=str(DATA_FILE), help="parquet produced by process_axes.py")
+    parser.add_argument("--text", help="text table (default: derived from --data, e.g. centrale_axes_text.parquet)")
+    parser.add_argument("--output", default=str(MODEL_FILE))
+    parser.add_argument("--all-annotations", action="store_true",
+                        help="also use records whose Grist axes agree with the keyword baseline "
+                             "(default: only the corrections)")
+    parser.add_argument("-C", type=float, default=4.0, help="inverse regularisation strength")
+    args = parser.parse_args()
+
+    corrections = load_corrections(args.grist_csv)
+    works = load_works(args.data, args.text)
+    labelled = works.merge(corrections, on="work_id", how="inner")
+    if not args.all_annotations:
+        corrected = [parse_axes(v) != kw for v, kw in zip(labelled["axes"], keyword_axes(labelled))]
+        labelled = labelled[corrected]
+    if labelled.empty:
+        raise SystemExit("Aucune publication annotée dans Grist ne correspond aux données.")
+
+    print(f"Entraînement sur {len(labelled)} publications annotées...")
+    texts = [model_text(r) for r in labelled.to_dict("records")]
+    label_sets = [parse_axes(v) for v in labelled["axes"]]
+    model = train(texts, label_sets, C=args.C)
+
+    joblib.dump(model, args.output)
+    print(f"Modèle ({len(model['vectorizer'].vocabulary_)} termes) enregistré dans {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+import streamlit as st
+
+# =============================================================================
+# INSTRUMENTATION DES RERUNS (optionnelle)
+#
+# Activée par la variable d'environnement DATAVIZ_PERF=1 ou par ?perf=1 dans
+# l'URL. Un rerun est découpé en étapes consécutives (mark) et en
+# sous-étapes chronométrées (section) ; les appels aux fonctions décorées par
+# perf.cache_data sont comptés (hits / misses du cache). panel() affiche le
+# détail du rerun dans la barre latérale et l'ajoute au journal JSON lines
+# DATAVIZ_PERF_LOG (par défaut perf_log.jsonl à côté de ce fichier). Un
+# fragment décoré par perf.fragment fait partie de l'étape en cours du rerun
+# complet ; relancé seul, il a sa propre mesure, affichée en bas du fragment.
+#
+#   perf.start(__file__)          # juste après st.set_page_config
+#   perf.mark("Filtres")          # début d'une étape
+#   with perf.section("Figures"): # sous-étape
+#   @perf.fragment                # à la place de @st.fragment
+#   perf.panel()                  # fin du script
+#
+# Désactivée, chaque appel se réduit à un test. Les appels faits depuis
+# d'autres threads (ThreadPoolExecutor) ne sont pas comptés. Le module est
+# partagé par les études, qui ajoutent le dossier studies/ à sys.path :
+#
+#   STUDIES_DIR = str(Path(__file__).resolve().parents[1])
+#   if STUDIES_DIR not in sys.path:
+#       sys.path.insert(0, STUDIES_DIR)
+#   import perf
+# =============================================================================
+
+LOG_FILE = Path(os.environ.get("DATAVIZ_PERF_LOG", Path(__file__).with_name("perf_log.jsonl")))
+
+# Rerun en cours : un script Streamlit s'exécute dans son propre thread
+_local = threading.local()
+
+
+class _Run:
+    """Mesures d'un rerun : étapes, sous-étapes et appels des fonctions en cache."""
+
+    def __init__(self, script, fragment=None):
+        self.script = script
+        self.fragment = fragment
+        self.t0 = self.last = time.perf_counter()
+        self.step = None
+        self.steps = {}     # étape → secondes, dans l'ordre d'exécution
+        self.sections = {}  # sous-étape → secondes
+        self.cache = {}     # fonction → [appels, misses, secondes]
+
+    def close_step(self):
+        now = time.perf_counter()
+        if self.step is not None:
+            self.steps[self.step] = self.steps.get(self.step, 0.0) + now - self.last
+        self.last = now
+
+
+def _current():
+    return getattr(_local, 'run', None)
+
+
+def _enabled():
+    return os.environ.get("DATAVIZ_PERF") == "1" or st.query_params.get("perf") == "1"
+
+
+def start(script):
+    """Début du rerun. Sans effet (hors lecture du réglage) si l'instrumentation est désactivée."""
+    _local.script = Path(script).name
+    _local.run = _Run(_local.script) if _enabled() else None
+    mark("Démarrage")
+
+
+def mark(name):
+    """Termine l'étape en cours et commence l'étape name."""
+    run = _current()
+    if run is not None:
+        run.close_step()
+        run.step = name
+
+
+@contextmanager
+def section(name):
+    """Chronomètre un bloc (cumulé si le même nom revient dans le rerun)."""
+    run = _current()
+    if run is None:
+        yield
+        return
+    t = time.perf_counter()
+    try:
+        yield
+    finally:
+        run.sections[name] = run.sections.get(name, 0.0) + time.perf_counter() - t
+
+
+def cache_data(func=None, **kwargs):
+    """
+    st.cache_data qui compte les appels et les misses de la fonction : le
+    corps n'est exécuté que sur un miss, les autres appels sont des hits.
+    """
+    def decorate(f):
+        name = f.__qualname__
+
+        @functools.wraps(f)
+        def compute(*args, **kw):
+            run = _current()
+            if run is not None:
+                run.cache.setdefault(name, [0, 0, 0.0])[1] += 1
+            return f(*args, **kw)
+
+        cached = st.cache_data(**kwargs)(compute)
+
+        @functools.wraps(f)
+        def call(*args, **kw):
+            run = _current()
+            if run is None:
+                return cached(*args, **kw)
+            t = time.perf_counter()
+            try:
+                return cached(*args, **kw)
+            finally:
+                stats = run.cache.setdefault(name, [0, 0, 0.0])
+                stats[0] += 1
+                stats[2] += time.perf_counter() - t
+
+        call.clear = cached.clear
+        return call
+
+    return decorate(func) if func is not None else decorate
+
+
+def fragment(func=None, **kwargs):
+    """
+    st.fragment mesuré : exécuté pendant un rerun complet, le fragment fait
+    partie de l'étape en cours ; relancé seul (widget du fragment), il a sa
+    propre mesure, affichée en bas du fragment et ajoutée au journal.
+    """
+    def decorate(f):
+        name = f.__qualname__
+
+        @functools.wraps(f)
+        def call(*args, **kw):
+            if _current() is not None or not _enabled():
+                return f(*args, **kw)
+            _local.run = _Run(getattr(_local, 'script', None), fragment=name)
+            mark("Fragment")
+            try:
+                return f(*args, **kw)
+            finally:
+                # Un fragment ne peut pas écrire dans la barre latérale
+                panel(container=st)
+
+        return st.fragment(**kwargs)(call)
+
+    return decorate(func) if func is not None else decorate
+
+
+def panel(container=None):
+    """Affiche le détail du rerun (par défaut dans la barre latérale) et l'ajoute au journal."""
+    run = _current()
+    if run is None:
+        return None
+    _local.run = None
+    run.close_step()
+    total = time.perf_counter() - run.t0
+    record = {
+        'time': datetime.now().isoformat(timespec='seconds'),
+        'script': run.script,
+        **({'fragment': run.fragment} if run.fragment else {}),
+        'total_ms': round(total * 1000, 1),
+        'steps': {k: round(v * 1000, 1) for k, v in run.steps.items()},
+        'sections': {k: round(v * 1000, 1) for k, v in run.sections.items()},
+        'cache': {k: {'calls': c, 'hits': c - m, 'misses': m, 'ms': round(s * 1000, 1)}
+                  for k, (c, m, s) in run.cache.items()},
+    }
+
+    title = f"du fragment {run.fragment}" if run.fragment else "du rerun"
+    with (container or st.sidebar).expander(f"⏱️ Performances {title} ({record['total_ms']:.0f} ms)"):
+        st.caption("Étapes (ms)")
+        st.dataframe(pd.Series(record['steps'], name='ms', dtype=float), width='stretch')
+        if record['sections']:
+            st.caption("Sous-étapes (ms)")
+            st.dataframe(pd.Series(record['sections'], name='ms', dtype=float), width='stretch')
+        if record['cache']:
+            st.caption("Fonctions en cache")
+            st.dataframe(pd.DataFrame.from_dict(record['cache'], orient='index'), width='stretch')
+        st.caption(f"Journal : {LOG_FILE}")
+
+    try:
+        with open(LOG_FILE, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    except OSError:
+        # Système de fichiers en lecture seule : le panneau reste affiché
+        pass
+    return record
@@ -0,0 +1,99 @@
+import os
+import threading
+from functools import lru_cache
+from pathlib import Path
+
+import streamlit as st
+
+# =============================================================================
+# MOTEUR SQL OPTIONNEL (DuckDB)
+#
+# Activé par la variable d'environnement DATAVIZ_ENGINE=duckdb. Les fichiers
+# parquet des études sont enregistrés comme vues d'une connexion DuckDB en
+# mémoire et interrogés en place (colonnes lues à la demande) : les filtres
+# de la barre latérale et les listes de leurs options sont des requêtes
+# paramétrées, dont les résultats sont mis en cache (LRU) ; le même état des
+# filtres ne relance pas la requête. Sans la variable, get() renvoie None et
+# les applications filtrent en pandas comme d'habitude.
+#
+#   DATAVIZ_ENGINE=duckdb uv run --with duckdb streamlit run app.py
+#
+# Le module est partagé par les études, comme perf.py :
+#
+#   engine = sql_engine.get()
+#   if engine is not None:
+#       works = engine.query("SELECT ... FROM ls2n WHERE year BETWEEN ? AND ?", (2020, 2025))
+# =============================================================================
+
+STUDIES_DIR = Path(__file__).resolve().parent
+
+# Vue → fichier parquet de l'étude
+TABLES = {
+    'coop': Path("202603-unresearchcollab") / "cooperations_nantesu.parquet",
+    'ls2n': Path("202603-triton") / "cooperations_ls2n.parquet",
+    'axes': Path("202604-centrale-axes") / "centrale_axes_data.parquet",
+}
+
+
+def enabled():
+    return os.environ.get("DATAVIZ_ENGINE") == "duckdb"
+
+
+def study_tables():
+    """
+    Fichier de chaque vue : celui de DATAVIZ_DATA_DIR s'il existe (jeux de
+    test de bench_apps.py), sinon celui du dossier de l'étude. Les fichiers
+    absents (étude pas encore extraite) ne sont pas enregistrés.
+    """
+    data_dir = os.environ.get("DATAVIZ_DATA_DIR")
+    tables = {}
+    for name, path in TABLES.items():
+        candidates = ([Path(data_dir) / path.name] if data_dir else []) + [STUDIES_DIR / path]
+        found = next((p for p in candidates if p.exists()), None)
+        if found is not None:
+            tables[name] = found
+    return tables
+
+
+class SqlEngine:
+    """
+    Connexion DuckDB en mémoire, une vue par fichier parquet. Chaque vue a en
+    plus la colonne file_row_number (position de la ligne dans le fichier,
+    c'est-à-dire son index dans le DataFrame lu par pd.read_parquet).
+    """
+
+    def __init__(self, tables, cache_size=256):
+        import duckdb
+
+        self.con = duckdb.connect()
+        self.lock = threading.Lock()
+        self.columns = {}
+        for name, path in tables.items():
+            escaped = str(path).replace("'", "''")
+            self.con.execute(f"CREATE VIEW {name} AS SELECT * FROM read_parquet('{escaped}', file_row_number = true)")
+            self.columns[name] = set(self.con.execute(f"SELECT * FROM {name} LIMIT 0").fetchdf().columns)
+        self.query = lru_cache(maxsize=cache_size)(self._query)
+
+    def _query(self, sql, params=()):
+        """Résultat (DataFrame) de la requête ; params : tuple de valeurs ou de tuples (listes SQL)."""
+        with self.lock:
+            return self.con.execute(sql, [list(p) if isinstance(p, tuple) else p for p in params]).fetchdf()
+
+    def values(self, sql, params=()):
+        """Première colonne du résultat, sans les valeurs manquantes, triée comme sorted()."""
+        return sorted(self.query(sql, params).iloc[:, 0].dropna().tolist())
+
+
+def split_values(column):
+    """Expression SQL de la liste des valeurs (nettoyées) d'une colonne séparée par '|'."""
+    return f"list_transform(string_split(coalesce({column}, ''), '|'), x -> trim(x))"
+
+
+@st.cache_resource
+def _load():
+    return SqlEngine(study_tables())
+
+
+def get():
+    """Moteur partagé par les sessions du processus, ou None si DATAVIZ_ENGINE n'est pas duckdb."""
+    return _load() if enabled() else None